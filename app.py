@@ -7,6 +7,7 @@ import sys
 import streamlit.components.v1 as components
 from funcoes_compartilhadas.estilos import aplicar_estilo_padrao, clear_caches
 from funcoes_compartilhadas.controle_acesso import login, usuario_logado, menus_liberados, logoutX
+from funcoes_compartilhadas.conversa_banco import inicia_medicao
 
 # ─── Redireciona para redefinir senha se necessário ───────────────────────────
 from urllib.parse import parse_qs
@@ -38,6 +39,7 @@ if query_params.get("recuperar") == "1":
 # ─── Configuração inicial ─────────────────────────────────────────────────────
 st.set_page_config(page_title="Meu App com I.A.", page_icon="⚡", layout="wide")
 aplicar_estilo_padrao()
+inicia_medicao()  # 📈 agrupa as chamadas à API deste rerun
 
 # ─── Estilo do menu lateral ──────────────────────────────────────────────────
 st.markdown("""
@@ -84,30 +86,29 @@ if not usuario_logado():
     login()
     st.stop()
 
-from funcoes_compartilhadas import conversa_banco
+from funcoes_compartilhadas import conversa_banco, esquemas
 from funcoes_compartilhadas.controle_acesso import menus_liberados
 
 # ─── MENU LATERAL ─────────────────────────────────────────────────────────────
 
-# 🔍 Busca menus e funcionalidades disponíveis no banco
-menus = conversa_banco.select("menus", {"ID": "id", "Nome": "texto", "Ordem": "numero100"})
-funcionalidades = conversa_banco.select("funcionalidades", {
-    "ID": "id",
-    "ID_Menu": "texto",
-    "Nome": "texto",
-    "Caminho": "texto",
-})
-
-menus = menus.sort_values("Ordem")
-
-# 🔐 Filtra funcionalidades com base nas permissões do usuário
+# 🔐 Funcionalidades liberadas para o usuário (None = admin, vê tudo)
 permissoes = menus_liberados()
-if permissoes is not None:
-    funcionalidades = funcionalidades[
-        funcionalidades["ID"].astype(str).isin(
-            [str(p["ID_Funcionalidade"]) for p in permissoes]
-        )
-    ]
+
+# 🔍 Busca menus e funcionalidades disponíveis no banco
+menus = conversa_banco.select(
+    "menus",
+    esquemas.MENUS,
+    colunas=["ID", "Nome", "Ordem"],
+    order_by="Ordem",
+)
+funcionalidades = conversa_banco.select(
+    "funcionalidades",
+    esquemas.FUNCIONALIDADES,
+    colunas=["ID", "ID_Menu", "Nome", "Caminho"],
+    where=None if permissoes is None else conversa_banco.em(
+        "ID", [p["ID_Funcionalidade"] for p in permissoes]
+    ),
+)
 
 # 🔗 Agrupa funcionalidades por menu
 menu_disponivel = {}
@@ -135,6 +136,13 @@ rotulo = st.sidebar.radio(
     index=0
 )
 
+# ⏳ Escrita adiada: gravações que ainda não chegaram à planilha
+escritas = conversa_banco.escritas_pendentes()
+if escritas["pendentes"]:
+    st.sidebar.caption(f"⏳ {escritas['pendentes']} gravação(ões) aguardando envio à planilha")
+if escritas["falhas"]:
+    st.sidebar.error(f"⚠️ {escritas['falhas']} gravação(ões) não enviada(s): {escritas['erro']}")
+
 logoutX()  # 🔒 Botão sair no final do menu lateral
 
 if rotulo == "Selecionar...":
@@ -143,4 +151,9 @@ if rotulo == "Selecionar...":
 # 🔄 Carrega e executa a página selecionada
 arquivo = next(k for k, v in funcionalidades_disp.items() if v == rotulo)
 modulo = reload_module(f"paginas.{arquivo}")
-modulo.app()
+try:
+    modulo.app()
+finally:
+    if permissoes is None:  # 🛠️ admin: custo em chamadas à API desta página
+        from funcoes_compartilhadas.painel_debug import painel_api
+        painel_api()
@@ -0,0 +1,77 @@
+# bench_leitura.py
+# Compara a leitura de uma aba de protocolos pelo caminho antigo (get_all_records:
+# um dict por linha) com o caminho atual (valores crus montados coluna a coluna),
+# os dois terminando no DataFrame tipado pelo esquema. Não acessa o Google:
+# a aba é uma planilha falsa em memória com valores como a API devolve (UNFORMATTED).
+#
+#   python bench_leitura.py
+
+import random
+import time
+import pandas as pd
+from gspread.utils import fill_gaps, numericise_all, to_records
+from funcoes_compartilhadas.conversa_banco import _valores_para_df
+from funcoes_compartilhadas.esquemas import PROTOCOLOS, ANDAMENTOS, TIPOS_SERVICO, MILITARES
+
+TAMANHOS = [1_000, 10_000, 50_000]
+REPETICOES = 3
+
+class AbaFalsa:
+    """Só o que a leitura usa de um gspread.Worksheet, sobre uma lista de linhas"""
+
+    def __init__(self, valores: list):
+        self.valores = valores
+
+    def get(self, **kwargs) -> list:
+        return [list(linha) for linha in self.valores]
+
+    def get_all_records(self, **kwargs) -> list:
+        # Mesmos passos do gspread: preenche as lacunas, numericise linha a linha, dicts
+        valores = fill_gaps(self.get())
+        return to_records(valores[0], [numericise_all(linha) for linha in valores[1:]])
+
+def gera_aba(linhas: int) -> AbaFalsa:
+    random.seed(linhas)
+    valores = [list(PROTOCOLOS)]
+    for i in range(linhas):
+        valores.append([
+            f"20250101_000000_{i}",
+            random.randint(44000, 46000),              # data serial
+            f"{random.randint(1, 99999)}/2025",
+            random.choice(TIPOS_SERVICO),
+            str(random.randint(10**10, 10**11 - 1)),
+            f"Empresa {i}",
+            random.choice([random.randint(20, 900), round(random.uniform(20, 900), 2), ""]),
+            random.choice(["Notificado", ""]),
+            random.choice([random.randint(44000, 46000), ""]),
+            random.choice([random.randint(44000, 46000), ""]),
+            random.choice(["Comércio", "Indústria", "Serviço"]),
+            f"(62) 9{random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
+            random.choice(MILITARES),
+            random.choice(ANDAMENTOS),
+            "Porangatu",
+        ])
+    return AbaFalsa(valores)
+
+def caminho_antigo(ws: AbaFalsa) -> pd.DataFrame:
+    df = pd.DataFrame(ws.get_all_records(value_render_option="UNFORMATTED_VALUE")).rename(columns=str.strip)
+    return PROTOCOLOS.converte(df)
+
+def caminho_novo(ws: AbaFalsa) -> pd.DataFrame:
+    return PROTOCOLOS.converte(_valores_para_df(ws.get(value_render_option="UNFORMATTED_VALUE")))
+
+def mede(funcao, ws: AbaFalsa) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao(ws)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+if __name__ == "__main__":
+    print(f"{'linhas':>8} {'get_all_records':>16} {'valores crus':>13} {'ganho':>7}")
+    for linhas in TAMANHOS:
+        ws = gera_aba(linhas)
+        pd.testing.assert_frame_equal(caminho_antigo(ws), caminho_novo(ws))
+        antigo, novo = mede(caminho_antigo, ws), mede(caminho_novo, ws)
+        print(f"{linhas:>8} {antigo * 1000:>14.1f}ms {novo * 1000:>11.1f}ms {antigo / novo:>6.1f}x")
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Indicadores do relatório operacional em consultas agrupadas:
+• pandas (padrão): um value_counts + somas vetorizadas, sem uma máscara por indicador
+• DuckDB (opcional, motor_analitico = "duckdb" no [conversa_banco]): as mesmas
+  contagens em um SELECT com FILTER e um GROUP BY sobre o recorte colunar
+"""
+
+import pandas as pd
+from funcoes_compartilhadas.conversa_banco import _config
+
+try:
+    import duckdb  # opcional: pip install duckdb
+except ImportError:
+    duckdb = None
+
+# Em ~300 mil linhas o pandas ainda ganha (converter colunas object custa mais
+# que a consulta); o DuckDB compensa com histórico maior ou mais agregações.
+MOTOR_ANALITICO = _config("motor_analitico", "pandas")
+
+# ─── Resumo geral + pendências + quebra por tipo de serviço ──────
+_SQL_INDICADORES = """
+SELECT
+    count(*)                                                     AS protocolos,
+    count(*) FILTER (WHERE andamento = 'Vistoria Feita')         AS vistorias,
+    count(*) FILTER (WHERE andamento = 'Cercon Impresso')        AS cercons,
+    count(*) FILTER (WHERE andamento = 'Não Certificou')         AS nao_certificou,
+    count(*) FILTER (WHERE notificacao = 'Notificado')           AS notificados,
+    count(*) FILTER (WHERE andamento = 'Protocolado')            AS protocolados,
+    count(*) FILTER (WHERE validade < $hoje)                     AS cercons_vencidos,
+    count(*) FILTER (WHERE validade BETWEEN $hoje AND $limite)   AS cercons_30
+FROM protocolos
+"""
+
+def _base(df: pd.DataFrame) -> pd.DataFrame:
+    """Só as colunas usadas, com tipos limpos (a planilha mistura texto e número)"""
+    return pd.DataFrame({
+        "andamento": df["Andamento"].astype(str),
+        "notificacao": df["Notificação"].astype(str),
+        "tipo_servico": df["Tipo de Serviço"].astype(str),
+        "validade": df["Validade do Cercon"],
+    })
+
+def _pandas(df: pd.DataFrame, hoje: pd.Timestamp, limite: pd.Timestamp):
+    andamento = df["Andamento"].value_counts()
+    validade = df["Validade do Cercon"]
+    indicadores = {
+        "protocolos": len(df),
+        "vistorias": andamento.get("Vistoria Feita", 0),
+        "cercons": andamento.get("Cercon Impresso", 0),
+        "nao_certificou": andamento.get("Não Certificou", 0),
+        "notificados": (df["Notificação"] == "Notificado").sum(),
+        "protocolados": andamento.get("Protocolado", 0),
+        "cercons_vencidos": (validade < hoje).sum(),
+        "cercons_30": validade.between(hoje, limite).sum(),
+    }
+    return indicadores, df["Tipo de Serviço"].astype(str).value_counts().items()
+
+def _duckdb(df: pd.DataFrame, hoje: pd.Timestamp, limite: pd.Timestamp):
+    with duckdb.connect() as con:
+        con.register("protocolos", _base(df))
+        cursor = con.execute(
+            _SQL_INDICADORES,
+            {"hoje": hoje.to_pydatetime(), "limite": limite.to_pydatetime()},
+        )
+        nomes = [c[0] for c in cursor.description]
+        indicadores = dict(zip(nomes, cursor.fetchone()))
+        por_servico = con.execute(
+            "SELECT tipo_servico, count(*) FROM protocolos GROUP BY tipo_servico"
+        ).fetchall()
+    return indicadores, por_servico
+
+def resumo_operacional(df: pd.DataFrame, hoje: pd.Timestamp, dias: int = 30) -> tuple:
+    """(contadores do resumo e das pendências, {tipo de serviço: quantidade})"""
+    limite = hoje + pd.Timedelta(days=dias)
+    motor = _duckdb if MOTOR_ANALITICO == "duckdb" and duckdb is not None else _pandas
+    indicadores, por_servico = motor(df, hoje, limite)
+    indicadores = {k: int(v) for k, v in indicadores.items()}
+    indicadores["vistoria_sem_cercon"] = indicadores["vistorias"]
+    return indicadores, {tipo: int(n) for tipo, n in por_servico}
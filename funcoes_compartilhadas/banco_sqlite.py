@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+Backends SQLite do conversa_banco (mesmas funções, sem cota de API):
+• BackendSQLite: uma tabela por aba, criada a partir dos esquemas (funcoes_compartilhadas/esquemas.py)
+• Índices em ID, Cidade, Andamento e Militar Responsável
+• BackendReplica: Google Sheets continua sendo a fonte; leituras vêm de uma
+  réplica SQLite mantida por uma thread de sincronização
+• Ativados com backend = "sqlite" ou "replica" na seção [conversa_banco] do secrets.toml
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from funcoes_compartilhadas.conversa_banco import (
+    Backend, _BackendSheets, ABAS_PROTOCOLOS, esquema_de, _valor_celula, _candidatos,
+    _filtros, _mascara, em, eq, _registros_com_id, _registros, _diferencas, _resultado_upsert, _le_abas, _versao_planilha,
+)
+
+# ─── Tipos do esquema → afinidade SQLite ─────────────────────────
+# Coluna sem tipo declarado fica sem afinidade: guarda o valor como veio da planilha
+AFINIDADES = {
+    "id": "TEXT",
+    "texto": "TEXT",
+    "data": "TEXT",          # guardada como veio (texto dd/mm/aaaa ou serial)
+    "numero": "NUMERIC",
+    "numero100": "NUMERIC",
+}
+COLUNAS_INDEXADAS = ("ID", "Cidade", "Andamento", "Militar Responsável")
+LOTE_PARAMETROS = 500  # SQLite limita a quantidade de "?" por comando
+def _q(nome: str) -> str:
+    """Identificador entre aspas (as colunas têm espaço e acento)"""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+class BackendSQLite(Backend):
+    """Uma conexão por processo, serializada por lock (escritas são curtas)"""
+
+    def __init__(self, arquivo: str):
+        pasta = os.path.dirname(arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.arquivo = arquivo
+        self._con = sqlite3.connect(arquivo, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.RLock()
+        self._colunas: dict = {}  # tabela -> [colunas], evita PRAGMA a cada chamada
+
+    # ─── DDL ─────────────────────────────────────────────────────
+    def _colunas_da_tabela(self, tabela: str):
+        if tabela not in self._colunas:
+            info = self._con.execute(f"PRAGMA table_info({_q(tabela)})").fetchall()
+            if not info:
+                return None
+            self._colunas[tabela] = [linha[1] for linha in info]
+        return self._colunas[tabela]
+
+    def _garante_tabela(self, tabela: str, colunas: list, tipos_colunas: dict = None) -> list:
+        """Cria a tabela (ou acrescenta colunas novas) e os índices; devolve as colunas"""
+        tipos_colunas = tipos_colunas or {}
+        colunas = ["ID"] + [c for c in colunas if c != "ID"]
+        existentes = self._colunas_da_tabela(tabela)
+        with self._con:
+            if existentes is None:
+                # ID só indexado (não PRIMARY KEY): a planilha aceita IDs repetidos ou vazios
+                definicoes = [f"{_q(c)} {AFINIDADES.get(tipos_colunas.get(c), '')}" for c in colunas]
+                self._con.execute(f"CREATE TABLE {_q(tabela)} ({', '.join(definicoes)})")
+                existentes = []
+            novas = [c for c in colunas if c not in existentes]
+            if existentes:
+                for c in novas:
+                    self._con.execute(
+                        f"ALTER TABLE {_q(tabela)} ADD COLUMN {_q(c)} "
+                        f"{AFINIDADES.get(tipos_colunas.get(c), '')} DEFAULT ''"
+                    )
+            for c in COLUNAS_INDEXADAS:
+                if c in novas:
+                    self._con.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_q(f'ix_{tabela}_{c}')} ON {_q(tabela)} ({_q(c)})"
+                    )
+        self._colunas[tabela] = existentes + novas
+        return self._colunas[tabela]
+
+    def tabelas(self) -> set:
+        with self._lock:
+            linhas = self._con.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return {linha[0] for linha in linhas}
+
+    def substitui(self, tabela: str, df: pd.DataFrame) -> None:
+        """Troca todo o conteúdo da tabela pelo DataFrame, numa transação só"""
+        colunas = [c for c in df.columns if str(c).strip()]
+        with self._lock:
+            existentes = self._colunas_da_tabela(tabela)
+            if existentes is not None and set(existentes) != {"ID", *colunas}:
+                with self._con:  # colunas mudaram na planilha: recria
+                    self._con.execute(f"DROP TABLE {_q(tabela)}")
+                self._colunas.pop(tabela, None)
+            self._garante_tabela(tabela, colunas)
+            with self._con:
+                self._con.execute(f"DELETE FROM {_q(tabela)}")
+                if colunas and not df.empty:
+                    self._con.executemany(
+                        f"INSERT INTO {_q(tabela)} ({', '.join(map(_q, colunas))}) "
+                        f"VALUES ({', '.join('?' * len(colunas))})",
+                        [[_valor_celula(v) for v in linha]
+                         for linha in df[colunas].itertuples(index=False, name=None)],
+                    )
+
+    def _coluna_real(self, tabela: str, campo: str) -> str:
+        """Nome da coluna ignorando maiúsculas/espaços, como no backend Sheets"""
+        for c in self._colunas_da_tabela(tabela) or []:
+            if c.strip().lower() == campo.strip().lower():
+                return c
+        raise KeyError(campo)
+
+    # ─── SELECT ──────────────────────────────────────────────────
+    def _le(self, tabela: str, colunas: list = None) -> pd.DataFrame:
+        if colunas is None:
+            lista = "*"
+        else:
+            existentes = self._colunas_da_tabela(tabela) or []
+            lista = ", ".join(_q(c) for c in colunas if c in existentes)
+            if not lista:
+                return pd.DataFrame()
+        df = pd.read_sql_query(f"SELECT {lista} FROM {_q(tabela)}", self._con)
+        return df.fillna("")  # célula vazia na planilha também chega como ""
+
+    def select_aba(self, tabela, tipos_colunas, colunas=None):
+        esquema = esquema_de(tipos_colunas, tabela)
+        with self._lock:
+            self._garante_tabela(tabela, list(esquema), esquema)
+            df = self._le(tabela, colunas)
+        return esquema.converte(df)
+
+    def select_protocolos(self, tipos_colunas, colunas=None):
+        lista_df = []
+        with self._lock:
+            for nome in ABAS_PROTOCOLOS:
+                if self._colunas_da_tabela(nome) is None:
+                    continue
+                df = self._le(nome, colunas)
+                if df.empty:
+                    continue
+                df["Cidade"] = nome  # ✅ adiciona cidade, útil no código
+                lista_df.append(df)
+        df_final = pd.concat(lista_df, ignore_index=True) if lista_df else pd.DataFrame()
+        return esquema_de(tipos_colunas, ABAS_PROTOCOLOS[0]).converte(df_final)
+
+    # ─── INSERT / UPDATE / DELETE ────────────────────────────────
+    def insert(self, tabela, dados, tipos_colunas=None):
+        registros = _registros_com_id(dados)
+        if not registros:
+            return
+        colunas = list(dict.fromkeys(c for r in registros for c in r))
+        with self._lock:
+            self._garante_tabela(tabela, colunas, tipos_colunas)
+            with self._con:
+                self._con.executemany(
+                    f"INSERT INTO {_q(tabela)} ({', '.join(map(_q, colunas))}) "
+                    f"VALUES ({', '.join('?' * len(colunas))})",
+                    [[_valor_celula(r.get(c, "")) for c in colunas] for r in registros],
+                )
+
+    def _onde(self, tabela: str, where) -> tuple:
+        """(coluna SQL, valores) para um WHERE ... IN: igualdade vai direto
+        para a coluna (usa o índice); os outros filtros viram rowids"""
+        filtros = _filtros(where)
+        if len(filtros) == 1 and filtros[0].op == "em":
+            coluna = _q(self._coluna_real(tabela, filtros[0].campo))
+            return coluna, [c for v in filtros[0].valores for c in _candidatos(v)]
+        df = pd.read_sql_query(f"SELECT rowid AS _rowid, * FROM {_q(tabela)}", self._con).fillna("")
+        linhas = df.drop(columns="_rowid")
+        return "rowid", df.loc[_mascara(linhas, filtros), "_rowid"].tolist()
+
+    def _em_lotes(self, sql: str, antes: list, valores: list) -> int:
+        """Executa `sql` (terminado em IN) em lotes de LOTE_PARAMETROS valores"""
+        total = 0
+        with self._con:
+            for i in range(0, len(valores), LOTE_PARAMETROS):
+                lote = valores[i:i + LOTE_PARAMETROS]
+                total += self._con.execute(
+                    f"{sql} ({', '.join('?' * len(lote))})", antes + lote,
+                ).rowcount
+        return total
+
+    def update(self, tabela, campos, valores, where, tipos_colunas):
+        with self._lock:
+            if self._colunas_da_tabela(tabela) is None:
+                return 0
+            campos = [self._coluna_real(tabela, c) for c in campos]
+            coluna, alvos = self._onde(tabela, where)
+            return self._em_lotes(
+                f"UPDATE {_q(tabela)} SET {', '.join(f'{_q(c)} = ?' for c in campos)} "
+                f"WHERE {coluna} IN",
+                [_valor_celula(v) for v in valores], alvos,
+            )
+
+    def delete(self, tabela, where, tipos_colunas):
+        with self._lock:
+            if self._colunas_da_tabela(tabela) is None:
+                return 0
+            coluna, alvos = self._onde(tabela, where)
+            return self._em_lotes(f"DELETE FROM {_q(tabela)} WHERE {coluna} IN", [], alvos)
+
+    def delete_many(self, tabela, ids, id_col="ID"):
+        if not len(ids):
+            return 0
+        return self.delete(tabela, em(id_col, ids), {})
+
+    def upsert(self, tabela, dados, key="ID", tipos_colunas=None, so_atualiza=False):
+        registros = _registros(dados)
+        with self._lock:
+            existe = self._colunas_da_tabela(tabela) is not None
+            diferencas = _diferencas(self._le(tabela) if existe else pd.DataFrame(), registros, key)
+            novos = [] if so_atualiza else [r for r, mudou in diferencas if mudou is None]
+            alterados = [(r, mudou) for r, mudou in diferencas if mudou]
+            if alterados:
+                self._garante_tabela(tabela, [c for _, m in alterados for c in m], tipos_colunas or {})
+                coluna = self._coluna_real(tabela, key)
+                with self._con:
+                    for registro, mudou in alterados:
+                        alvos = _candidatos(registro.get(key, ""))
+                        self._con.execute(
+                            f"UPDATE {_q(tabela)} SET {', '.join(f'{_q(c)} = ?' for c in mudou)} "
+                            f"WHERE {_q(coluna)} IN ({', '.join('?' * len(alvos))})",
+                            [_valor_celula(v) for v in mudou.values()] + alvos,
+                        )
+            if novos:
+                self.insert(tabela, novos, tipos_colunas)
+        ausente = "ausente" if so_atualiza else "inserido"
+        estados = [ausente if m is None else "atualizado" if m else "inalterado" for _, m in diferencas]
+        return _resultado_upsert(registros, key, estados)
+
+    def move(self, id_linha, de, para, alteracoes=None, id_col="ID", tipos_colunas=None):
+        alteracoes = dict(alteracoes or {})
+        with self._lock:
+            if self._colunas_da_tabela(de) is None:
+                return 0
+            if de == para:
+                if not alteracoes:
+                    return 0
+                return self.update(de, list(alteracoes), list(alteracoes.values()), eq(id_col, id_linha), {})
+            coluna = _q(self._coluna_real(de, id_col))
+            alvos = _candidatos(id_linha)
+            filtro = f"WHERE {coluna} IN ({', '.join('?' * len(alvos))})"
+            linhas = pd.read_sql_query(f"SELECT * FROM {_q(de)} {filtro}", self._con, params=alvos)
+            if linhas.empty:
+                return 0
+            nomes = {c.strip().lower(): c for c in linhas.columns}
+            alteracoes = {nomes.get(c.strip().lower(), c.strip()): v for c, v in alteracoes.items()}
+            registros = [{**r, **alteracoes} for r in linhas.fillna("").to_dict("records")]
+            colunas = list(dict.fromkeys(c for r in registros for c in r))
+            self._garante_tabela(para, colunas, tipos_colunas)
+            # ✅ Inclusão e exclusão na mesma transação
+            with self._con:
+                self._con.executemany(
+                    f"INSERT INTO {_q(para)} ({', '.join(map(_q, colunas))}) "
+                    f"VALUES ({', '.join('?' * len(colunas))})",
+                    [[_valor_celula(r.get(c, "")) for c in colunas] for r in registros],
+                )
+                self._con.execute(f"DELETE FROM {_q(de)} {filtro}", alvos)
+            return len(registros)
+
+
+# ─── Réplica: lê do SQLite, escreve na planilha e na réplica ─────
+ABAS_REPLICADAS = ABAS_PROTOCOLOS + [
+    "usuarios", "permissoes", "menus", "funcionalidades", "eventos", "painel_financeiro",
+]
+
+def _assinatura(df: pd.DataFrame) -> str:
+    return hashlib.sha1(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+class BackendReplica(Backend):
+    """Google Sheets é a fonte da verdade; as leituras saem da réplica local.
+    A sincronização lê todas as abas em uma requisição e só regrava as que mudaram."""
+
+    def __init__(self, arquivo: str, intervalo: float = 60):
+        self.local = BackendSQLite(arquivo)
+        self.origem = _BackendSheets()
+        self.intervalo = intervalo
+        self.abas = list(ABAS_REPLICADAS)
+        self._copiadas = self.local.tabelas()   # do arquivo de uma execução anterior
+        self._ausentes: set = set()             # abas que não existem na planilha
+        self._assinaturas: dict = {}            # tabela -> conteúdo da última cópia
+        self._versoes: dict = {}                # tabela -> nº de escritas aplicadas
+        self._versao_copiada = None             # modifiedTime da planilha na última rodada
+        self._sync_lock = threading.Lock()
+        self._escrita = threading.Lock()
+        threading.Thread(target=self._laco, name="replica-sqlite", daemon=True).start()
+
+    # ─── Sincronização ───────────────────────────────────────────
+    def _laco(self) -> None:
+        while True:
+            try:
+                self.sincroniza()
+            except Exception as e:
+                print(f"[conversa_banco] sincronização da réplica falhou: {e}")
+            time.sleep(self.intervalo)
+
+    def sincroniza(self, abas: list = None) -> None:
+        """Copia as abas da planilha para a réplica (todas, por padrão).
+        A rodada completa é pulada se a planilha não mudou desde a anterior."""
+        with self._sync_lock:
+            if abas is not None:
+                self._sincroniza(list(abas))
+                return
+            versao = _versao_planilha()
+            if versao is not None and versao == self._versao_copiada:
+                return
+            self._sincroniza(list(self.abas))
+            self._versao_copiada = versao
+
+    def _sincroniza(self, abas: list) -> None:
+        versoes = {t: self._versoes.get(t, 0) for t in abas}
+        lidas = _le_abas(abas)
+        for tabela, df in lidas.items():
+            assinatura = _assinatura(df)
+            with self._escrita:
+                if self._versoes.get(tabela, 0) != versoes[tabela]:
+                    continue  # escrita durante a leitura: a próxima rodada copia
+                if tabela in self._copiadas and self._assinaturas.get(tabela) == assinatura:
+                    continue  # ✅ aba não mudou: nada a regravar
+                self.local.substitui(tabela, df)
+                self._assinaturas[tabela] = assinatura
+                self._copiadas.add(tabela)
+        self._ausentes = (self._ausentes | set(abas)) - set(lidas)
+
+    def _garante_copia(self, abas: list) -> None:
+        """Primeira leitura de uma aba ainda não copiada: sincroniza na hora"""
+        if all(t in self._copiadas or t in self._ausentes for t in abas):
+            return
+        with self._sync_lock:
+            faltando = [t for t in abas if t not in self._copiadas and t not in self._ausentes]
+            if faltando:
+                self.abas += [t for t in faltando if t not in self.abas]
+                self._sincroniza(faltando)
+
+    # ─── Leituras (locais) ───────────────────────────────────────
+    def select_aba(self, tabela, tipos_colunas, colunas=None):
+        self._garante_copia([tabela])
+        if tabela not in self._copiadas:
+            raise WorksheetNotFound(tabela)
+        with self.local._lock:
+            df = self.local._le(tabela, colunas)
+        return esquema_de(tipos_colunas, tabela).converte(df)
+
+    def select_protocolos(self, tipos_colunas, colunas=None):
+        self._garante_copia(ABAS_PROTOCOLOS)
+        return self.local.select_protocolos(tipos_colunas, colunas)
+
+    # ─── Escritas (planilha + réplica) ───────────────────────────
+    def _descarta(self, abas: list) -> None:
+        """Réplica fora de sincronia: a próxima leitura copia de novo (com _escrita)"""
+        for tabela in abas:
+            self._copiadas.discard(tabela)
+            self._assinaturas.pop(tabela, None)
+
+    def _escreve(self, tabela, na_origem, na_copia):
+        """`tabela` é uma aba ou a lista das abas que a escrita toca (move).
+        Versões e réplica mudam juntas, numa só seção: uma rodada de sincronização
+        que leu antes da escrita não regrava nenhuma dessas abas."""
+        abas = [tabela] if isinstance(tabela, str) else list(tabela)
+        resultado = na_origem()
+        with self._escrita:
+            for aba in abas:
+                self._versoes[aba] = self._versoes.get(aba, 0) + 1
+            if not all(aba in self._copiadas for aba in abas):
+                self._descarta(abas)  # a réplica só acompanha se tem todas as abas
+            else:
+                try:
+                    na_copia()
+                except Exception as e:
+                    print(f"[conversa_banco] réplica de {', '.join(abas)} descartada: {e}")
+                    self._descarta(abas)
+        return resultado
+
+    def insert(self, tabela, dados, tipos_colunas=None):
+        registros = _registros_com_id(dados)  # mesmos IDs nos dois lados
+        return self._escreve(
+            tabela,
+            lambda: self.origem.insert(tabela, registros, tipos_colunas),
+            lambda: self.local.insert(tabela, registros, tipos_colunas),
+        )
+
+    def update(self, tabela, campos, valores, where, tipos_colunas):
+        return self._escreve(
+            tabela,
+            lambda: self.origem.update(tabela, campos, valores, where, tipos_colunas),
+            lambda: self.local.update(tabela, campos, valores, where, tipos_colunas),
+        )
+
+    def delete(self, tabela, where, tipos_colunas):
+        return self._escreve(
+            tabela,
+            lambda: self.origem.delete(tabela, where, tipos_colunas),
+            lambda: self.local.delete(tabela, where, tipos_colunas),
+        )
+
+    def delete_many(self, tabela, ids, id_col="ID"):
+        return self._escreve(
+            tabela,
+            lambda: self.origem.delete_many(tabela, ids, id_col),
+            lambda: self.local.delete_many(tabela, ids, id_col),
+        )
+
+    def upsert(self, tabela, dados, key="ID", tipos_colunas=None, so_atualiza=False):
+        registros = _registros(dados)  # a planilha grava o ID dos novos nesses dicts
+        return self._escreve(
+            tabela,
+            lambda: self.origem.upsert(tabela, registros, key, tipos_colunas, so_atualiza),
+            lambda: self.local.upsert(tabela, registros, key, tipos_colunas, so_atualiza),
+        )
+
+    def move(self, id_linha, de, para, alteracoes=None, id_col="ID", tipos_colunas=None):
+        # As duas abas mudam juntas; sem uma delas na réplica, as duas são copiadas de novo
+        return self._escreve(
+            [de, para],
+            lambda: self.origem.move(id_linha, de, para, alteracoes, id_col, tipos_colunas),
+            lambda: self.local.move(id_linha, de, para, alteracoes, id_col, tipos_colunas),
+        )
@@ -15,6 +15,7 @@ import streamlit as st
 import pandas as pd
 import hashlib
 from funcoes_compartilhadas import conversa_banco
+from funcoes_compartilhadas.esquemas import USUARIOS, PERMISSOES
 from PIL import Image
 import base64
 from io import BytesIO
@@ -34,18 +35,8 @@ def image_base64(path):
 TABELA_USUARIOS = "usuarios"
 TABELA_PERMISSOES = "permissoes"
 
-TIPOS_USUARIOS = {
-    "ID": "id",
-    "Nome": "texto",
-    "Email": "texto",
-    "Senha": "texto",
-}
-
-TIPOS_PERMISSOES = {
-    "ID": "id",
-    "ID_Usuario": "texto",
-    "ID_Funcionalidade": "texto",
-}
+TIPOS_USUARIOS = USUARIOS
+TIPOS_PERMISSOES = PERMISSOES
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -187,11 +178,7 @@ def menus_liberados():
     if usuario_id in ["1", "ADMIN", "20251220_152855_192168116_1"]:
         return None
 
-    df = conversa_banco.select(TABELA_PERMISSOES, {
-        "ID": "id",
-        "ID_Usuario": "texto",
-        "ID_Funcionalidade": "texto",
-    })
+    df = conversa_banco.select(TABELA_PERMISSOES, TIPOS_PERMISSOES)
 
     if df.empty:
         return []
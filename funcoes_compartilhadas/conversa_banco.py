@@ -4,71 +4,367 @@ Camada de acesso Google Sheets ↔ Pandas (via Streamlit Secrets)
 """
 
 import pandas as pd
+import numpy as np
 import gspread
 from google.oauth2.service_account import Credentials
 import streamlit as st
 import time
-from functools import wraps
-from gspread.exceptions import APIError
+import threading
+import bisect
+import random
+import sys
+import os
+import re
+import json
+import logging
+import uuid
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from urllib.parse import unquote
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.http_client import HTTPClient
+from gspread.utils import (
+    rowcol_to_a1, a1_to_rowcol, absolute_range_name, numericise,
+    ValueInputOption, ValueRenderOption, InsertDataOption,
+)
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from funcoes_compartilhadas.cria_id import cria_id
+from funcoes_compartilhadas.esquemas import (
+    Esquema, esquema_de, para_datas, CIDADES, DOMINIOS, FORMATO_DATA, _ORIGEM_SERIAL, _texto,
+)
 
 # ===================================================
-# 🔐 CREDENCIAIS E CONEXÃO COM PLANILHA
+# ⚙️ CONFIGURAÇÃO ([conversa_banco] no secrets.toml)
 # ===================================================
+def _config(chave: str, padrao):
+    """Lê uma opção da seção [conversa_banco] do secrets.toml"""
+    try:
+        return st.secrets.get("conversa_banco", {}).get(chave, padrao)
+    except Exception:
+        return padrao
 
 # ===================================================
 # 🔐 CREDENCIAIS E CONEXÃO COM PLANILHA (STREAMLIT CLOUD)
 # ===================================================
 
-credenciais_info = st.secrets["gdrive_credenciais"]
-
 _scopes = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
 
-_gc = gspread.authorize(
-    Credentials.from_service_account_info(
-        credenciais_info,
-        scopes=_scopes
-    )
-)
-
 # Abra a planilha pelo link (coloque direto no código, ou puxe de outro segredo)
 URL_PLANILHA = "https://docs.google.com/spreadsheets/d/1liX-JNtRZpXj9lUB3YYYjUG5sG_IkpMitqSvlrcUDyI/edit"
-_sheet = _gc.open_by_url(URL_PLANILHA)  # ✅ ESTA LINHA FALTAVA
+
+# ✅ Conexão criada só no primeiro uso e compartilhada pelo processo inteiro:
+#    importar este módulo (login, redefinir senha...) não fala com o Google.
+_conexao_lock = threading.RLock()
+_planilha_aberta = None
+_abas: dict = {}  # título -> Worksheet
+
+def _planilha():
+    """Autoriza e abre a planilha uma única vez por processo"""
+    global _planilha_aberta
+    if _planilha_aberta is None:
+        with _conexao_lock:
+            if _planilha_aberta is None:
+                credenciais = Credentials.from_service_account_info(
+                    st.secrets["gdrive_credenciais"],
+                    scopes=_scopes
+                )
+                _planilha_aberta = gspread.authorize(
+                    credenciais, http_client=_ClienteHTTP
+                ).open_by_url(URL_PLANILHA)
+    return _planilha_aberta
+
+def _carrega_abas() -> None:
+    """Busca os metadados de todas as abas de uma vez e memoriza os handles"""
+    with _conexao_lock:
+        abas = _planilha().worksheets()
+        _abas.clear()
+        _abas.update({ws.title: ws for ws in abas})
+
+def _aba(nome: str):
+    """Worksheet pelo título, sem consultar metadados a cada chamada"""
+    ws = _abas.get(nome)
+    if ws is None:
+        _carrega_abas()  # aba nova (ou primeira chamada): atualiza a lista
+        ws = _abas.get(nome)
+        if ws is None:
+            raise WorksheetNotFound(nome)
+    return ws
+
+def _titulos_abas() -> set:
+    if not _abas:
+        _carrega_abas()
+    return set(_abas)
+
+def __getattr__(nome: str):
+    # Compatibilidade: `from conversa_banco import _sheet`
+    if nome == "_sheet":
+        return _planilha()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 # ===================================================
-# ❗❗ RETENTATIVAS API
+# ❗❗ COTA DA API: LIMITADOR + RETENTATIVAS
 # ===================================================
-def retry_api_error(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        tentativas = 15
+# Cotas do Sheets por usuário (a conta de serviço) e por minuto
+COTA_LEITURA_MIN = int(_config("cota_leitura_por_minuto", 60))
+COTA_ESCRITA_MIN = int(_config("cota_escrita_por_minuto", 60))
+TENTATIVAS = 6
+BACKOFF_BASE = 1.0    # segundos; dobra a cada tentativa
+BACKOFF_MAX = 32.0
+TIMEOUT_HTTP = 60     # segundos por requisição
+
+def _na_sessao() -> bool:
+    """True na thread do script Streamlit (onde st.spinner/st.toast funcionam)"""
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+def _espera(segundos: float) -> None:
+    if segundos <= 0:
+        return
+    if segundos >= 0.5 and _na_sessao():
         with st.spinner("⏳ Aguardando servidor..."):
-            for _ in range(tentativas):
-                try:
-                    return func(*args, **kwargs)
-                except APIError as e:
-                    print(f"[retry_api_error] {e}")
-                    if "Quota exceeded" in str(e):
-                        time.sleep(5)
-                    else:
-                        raise e
-        st.error("❌ Falha após múltiplas tentativas devido a limite de requisições.")
-        raise APIError("Falha após múltiplas tentativas devido a quota excedida.")
-    return wrapper
+            time.sleep(segundos)
+    else:
+        time.sleep(segundos)
+
+class _Balde:
+    """Token bucket thread-safe: `por_minuto` fichas, repostas continuamente"""
+
+    def __init__(self, por_minuto: int):
+        self.capacidade = float(max(1, por_minuto))
+        self.taxa = self.capacidade / 60.0
+        self.fichas = self.capacidade
+        self.momento = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _repoe(self) -> None:
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.momento) * self.taxa)
+        self.momento = agora
+
+    def espera(self) -> float:
+        """Segundos até haver uma ficha (0 = pode chamar agora)"""
+        with self.lock:
+            self._repoe()
+            return 0.0 if self.fichas >= 1 else (1 - self.fichas) / self.taxa
+
+    def adquirir(self) -> None:
+        while True:
+            with self.lock:
+                self._repoe()
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                falta = (1 - self.fichas) / self.taxa
+            _espera(falta)
+
+    def esvazia(self) -> None:
+        """O Google recusou por cota: ninguém chama até repor"""
+        with self.lock:
+            self._repoe()
+            self.fichas = min(self.fichas, 0.0)
+
+_baldes = {
+    "leitura": _Balde(COTA_LEITURA_MIN),
+    "escrita": _Balde(COTA_ESCRITA_MIN),
+}
+
+def _eh_erro_de_cota(e: APIError) -> bool:
+    return getattr(e, "code", None) == 429 or "Quota exceeded" in str(e)
+
+def _eh_transitorio(e: APIError) -> bool:
+    return _eh_erro_de_cota(e) or getattr(e, "code", 0) in (408, 500, 502, 503, 504)
+
+def _tipo_requisicao(method: str, endpoint: str):
+    if "googleapis.com/drive" in endpoint:
+        return None  # Drive tem cota própria
+    return "leitura" if method.upper() == "GET" else "escrita"
 
 # ===================================================
-# 🔢 ESCALA NUMÉRICA
+# 📈 INSTRUMENTAÇÃO DAS CHAMADAS À API
 # ===================================================
-def _scale(df: pd.DataFrame, tipos: dict, modo: str) -> pd.DataFrame:
-    df = df.copy()
-    for col, tipo in tipos.items():
-        if col not in df.columns:
-            continue
-        if tipo == "numero100":
-            df[col] = df[col] if modo == "mostrar" else df[col] * 100
-    return df
+# Cada requisição feita pelo gspread vira um registro: operação do conversa_banco,
+# chamada da API, aba(s), latência, bytes, tentativas e página de origem.
+# Os últimos ficam em memória (painel de depuração); o histórico vai para um log rotativo.
+ARQUIVO_LOG_API = _config("log_api", "logs/api_sheets.log")
+MAX_REGISTROS_API = 5000
+
+_registros_api = deque(maxlen=MAX_REGISTROS_API)
+_log_api = None
+
+def _logger_api():
+    """Logger com arquivo rotativo (1 MB x 5), criado no primeiro registro"""
+    global _log_api
+    if _log_api is None:
+        with _conexao_lock:
+            if _log_api is None:
+                log = logging.getLogger("conversa_banco.api")
+                log.setLevel(logging.INFO)
+                log.propagate = False
+                if not log.handlers:  # já configurado se o módulo foi recarregado
+                    try:
+                        pasta = os.path.dirname(ARQUIVO_LOG_API)
+                        if pasta:
+                            os.makedirs(pasta, exist_ok=True)
+                        handler = RotatingFileHandler(
+                            ARQUIVO_LOG_API, maxBytes=1_000_000, backupCount=5, encoding="utf-8"
+                        )
+                        handler.setFormatter(logging.Formatter("%(message)s"))
+                        log.addHandler(handler)
+                    except OSError as e:
+                        print(f"[conversa_banco] log da API desativado: {e}")
+                        log.addHandler(logging.NullHandler())
+                _log_api = log
+    return _log_api
+
+def inicia_medicao() -> None:
+    """Marca o início de uma execução (rerun) do script para a sessão atual.
+    Chamado pelo app.py; os registros seguintes ficam agrupados sob essa execução."""
+    st.session_state["_execucao_api"] = uuid.uuid4().hex
+
+def _execucao_atual():
+    if not _na_sessao():
+        return None
+    try:
+        return st.session_state.get("_execucao_api")
+    except Exception:
+        return None
+
+def _origem_da_chamada() -> tuple:
+    """(função pública do conversa_banco, página) olhando a pilha de chamadas"""
+    operacao, pagina, app = "", "", False
+    frame = sys._getframe(1)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if modulo == __name__:
+            nome = frame.f_code.co_name
+            funcao = frame.f_globals.get(nome)
+            if not operacao and not nome.startswith("_") and getattr(funcao, "__code__", None) is frame.f_code:
+                operacao = nome  # a mais interna: select_aba, insert, update...
+        elif modulo.startswith("paginas."):
+            pagina = modulo[len("paginas."):]  # a mais externa: amanda e não modelo_militar
+        elif modulo == "__main__":
+            app = True
+        frame = frame.f_back
+    if not pagina:
+        pagina = "app" if app else f"thread:{threading.current_thread().name}"
+    return operacao or "gspread", pagina
+
+def _nome_chamada(method: str, endpoint: str) -> str:
+    """Nome curto do método da API: values:batchGet, values:append, batchUpdate..."""
+    caminho = unquote(endpoint.split("?", 1)[0])
+    if "googleapis.com/drive" in caminho:
+        return f"drive.{method.lower()}"
+    resto = caminho.split("/spreadsheets/", 1)[-1].split("/", 1)
+    if len(resto) == 1:
+        return resto[0].split(":", 1)[1] if ":" in resto[0] else f"spreadsheets.{method.lower()}"
+    if resto[1].startswith("values:"):
+        return resto[1]
+    if resto[1].startswith("values/"):
+        verbo = re.search(r":([a-z][A-Za-z]*)$", resto[1])  # 'Aba'!A1:append (A1:Z9 não é verbo)
+        return f"values:{verbo.group(1)}" if verbo else f"values.{method.lower()}"
+    return resto[1]
+
+def _abas_da_chamada(endpoint: str, kwargs: dict) -> str:
+    """Abas envolvidas, extraídas dos intervalos A1 da URL/parâmetros/corpo"""
+    textos = [unquote(endpoint)]
+    params = kwargs.get("params") or {}
+    ranges = params.get("ranges") if isinstance(params, dict) else None
+    if ranges:
+        textos.extend(ranges if isinstance(ranges, (list, tuple)) else [ranges])
+    corpo = kwargs.get("json") or {}
+    nomes = set()
+    if isinstance(corpo, dict):
+        textos.extend(str(d.get("range", "")) for d in corpo.get("data", []) if isinstance(d, dict))
+        por_id = {ws.id: t for t, ws in list(_abas.items())}
+        for req in corpo.get("requests", []):
+            for valor in req.values():
+                faixa = valor.get("range", {}) if isinstance(valor, dict) else {}
+                if isinstance(faixa, dict) and faixa.get("sheetId") in por_id:
+                    nomes.add(por_id[faixa["sheetId"]])
+    for texto in textos:
+        nomes.update(n.replace("''", "'") for n in re.findall(r"'((?:[^']|'')+)'", str(texto)))
+    return ",".join(sorted(nomes))
+
+def _registra_chamada(method, endpoint, kwargs, resposta, erro, latencia, tentativas) -> None:
+    try:
+        operacao, pagina = _origem_da_chamada()
+        corpo = kwargs.get("json")
+        if resposta is None and erro is not None:
+            resposta = getattr(erro, "response", None)
+        registro = {
+            "momento": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "execucao": _execucao_atual(),
+            "pagina": pagina,
+            "operacao": operacao,
+            "chamada": _nome_chamada(method, endpoint),
+            "aba": _abas_da_chamada(endpoint, kwargs),
+            "latencia_ms": round(latencia * 1000, 1),
+            "bytes_enviados": len(json.dumps(corpo, ensure_ascii=False, default=str).encode()) if corpo else 0,
+            "bytes_recebidos": len(getattr(resposta, "content", b"") or b""),
+            "retentativas": tentativas,
+            "erro": str(getattr(erro, "code", "") or type(erro).__name__) if erro else "",
+        }
+        _registros_api.append(registro)
+        _logger_api().info(json.dumps(registro, ensure_ascii=False))
+    except Exception as e:  # medir nunca pode derrubar a chamada
+        print(f"[conversa_banco] falha ao registrar chamada: {e}")
+
+def chamadas_api(somente_execucao_atual: bool = True) -> pd.DataFrame:
+    """Registros das chamadas à API em memória (por padrão, só os do rerun atual da sessão)"""
+    registros = list(_registros_api)
+    if somente_execucao_atual:
+        execucao = _execucao_atual()
+        registros = [r for r in registros if execucao and r["execucao"] == execucao]
+    return pd.DataFrame(registros, columns=[
+        "momento", "execucao", "pagina", "operacao", "chamada", "aba", "latencia_ms",
+        "bytes_enviados", "bytes_recebidos", "retentativas", "erro",
+    ])
+
+class _ClienteHTTP(HTTPClient):
+    """HTTPClient do gspread que passa pelo limitador de cota e repete
+    erros transitórios com backoff exponencial + jitter.
+    Funciona também fora da sessão Streamlit (threads em segundo plano)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sem timeout, uma leitura travada seguraria todas as sessões que esperam por ela
+        self.timeout = TIMEOUT_HTTP
+
+    def request(self, method, endpoint, *args, **kwargs):
+        tipo = _tipo_requisicao(method, endpoint)
+        inicio = time.monotonic()
+        resposta, erro, tentativa = None, None, 0
+        try:
+            for tentativa in range(TENTATIVAS):
+                if tipo:
+                    _baldes[tipo].adquirir()
+                try:
+                    resposta = super().request(method, endpoint, *args, **kwargs)
+                    return resposta
+                except APIError as e:
+                    if not _eh_transitorio(e):
+                        raise
+                    if tipo and _eh_erro_de_cota(e):
+                        _baldes[tipo].esvazia()
+                    if tentativa == TENTATIVAS - 1:
+                        if _na_sessao():
+                            st.error("❌ Falha após múltiplas tentativas devido a limite de requisições.")
+                        raise
+                    espera = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa)
+                    espera = random.uniform(espera / 2, espera)
+                    print(f"[conversa_banco] {e} — nova tentativa em {espera:.1f}s")
+                    _espera(espera)
+        except Exception as e:
+            erro = e
+            raise
+        finally:
+            # Latência inclui espera do limitador e backoff: é o que a página sente
+            _registra_chamada(method, endpoint, kwargs, resposta, erro,
+                              time.monotonic() - inicio, tentativa)
 
 # ===================================================
 # 🔧 MAPEIA NOMES DE COLUNAS
@@ -76,50 +372,999 @@ def _scale(df: pd.DataFrame, tipos: dict, modo: str) -> pd.DataFrame:
 def _map_cols(df: pd.DataFrame) -> dict:
     return {c.lower(): c for c in df.columns}
 
+# ===================================================
+# 🧹 VALOR DE CÉLULA (tipos numpy/pandas → JSON)
+# ===================================================
+def _valor_celula(v):
+    """Converte escalares numpy/pandas para tipos nativos aceitos pela API"""
+    if v is None:
+        return ""
+    try:
+        if pd.isna(v):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    if hasattr(v, "item"):
+        return v.item()
+    return v
+
+# ===================================================
+# 🗃️ CACHE DE LEITURA (compartilhado por todas as sessões)
+# ===================================================
+# Tempo (segundos) que uma aba lida fica valendo para todas as sessões
+CACHE_TTL = float(_config("cache_ttl", 60))
+
+_cache: dict = {}  # aba -> (momento da leitura, DataFrame cru)
+_cache_lock = threading.Lock()
+
+def _cache_get(tabela: str):
+    with _cache_lock:
+        item = _cache.get(tabela)
+    if item is None:
+        return None
+    if time.monotonic() - item[0] < CACHE_TTL:
+        return item[1]
+    if not _inalterada(tabela):
+        return None
+    # ✅ Venceu, mas a planilha não mudou desde a leitura: renova sem baixar
+    with _cache_lock:
+        if _cache.get(tabela) is not item:
+            return None  # escrita no meio do caminho
+        _cache[tabela] = (time.monotonic(), item[1])
+    return item[1]
+
+def _cache_set(tabela: str, df: pd.DataFrame, grava_snapshot: bool = True, marca=None) -> None:
+    """Guarda a leitura; `marca` é a versão da planilha consultada ANTES de ler"""
+    with _cache_lock:
+        _cache[tabela] = (time.monotonic(), df)
+        if marca is None:
+            _marcadores.pop(tabela, None)
+        else:
+            _marcadores[tabela] = (marca, time.monotonic())
+    if "ID" in df.columns:
+        _define_indice(tabela, df["ID"].tolist())
+    if grava_snapshot:
+        _grava_snapshot(tabela, df)
+
+def invalida_cache(tabela: str, so_anexou: bool = False) -> None:
+    """Vence o cache de uma única aba (escrita feita por fora do conversa_banco
+    ou que não pôde ser aplicada ao cache). O último snapshot fica guardado para
+    o caso de cota esgotada e, se a escrita só acrescentou linhas no fim, para a
+    leitura incremental."""
+    with _cache_lock:
+        item = _cache.get(tabela)
+        if item is not None:
+            _cache[tabela] = (float("-inf"), item[1])
+        _marcadores.pop(tabela, None)
+        for chave in [c for c in _projecoes if c[0] == tabela]:
+            del _projecoes[chave]
+        if not so_anexou:
+            _bases_incrementais.pop(tabela, None)
+
+def _aplica_no_cache(tabela: str, aplica, campos=(), antes=None) -> None:
+    """Leia o que escreveu: em vez de vencer a aba depois de uma escrita nossa,
+    `aplica(df)` faz a mesma mudança no frame em cache. O próximo rerun sai da
+    memória, sem chamada à API, e já mostra a escrita (colunas derivadas, como
+    as datas, saem da conversão do frame novo). Projeções sem as colunas do
+    filtro (`campos`) são descartadas. `antes` é a versão da planilha
+    consultada logo antes da escrita (_versao_antes_da_escrita)."""
+    campos = {c.strip().lower() for c in campos}
+    novo = erro = None
+    with _cache_lock:
+        try:
+            item = _cache.get(tabela)
+            if item is not None:
+                novo = aplica(item[1])
+                _cache[tabela] = (item[0], novo)
+            for chave in [c for c in _projecoes if c[0] == tabela]:
+                momento, df = _projecoes[chave]
+                if campos <= {c.lower() for c in chave[1]}:
+                    _projecoes[chave] = (momento, _recorta(aplica(df), chave[1]))
+                else:
+                    del _projecoes[chave]
+        except Exception as e:
+            erro = e
+    if erro is not None:
+        print(f"[conversa_banco] cache de {tabela} não atualizado, será relido: {erro}")
+        invalida_cache(tabela)
+        return
+    if novo is not None:
+        _grava_snapshot(tabela, novo)
+    _escrita_propria(tabela, antes)
+
+def _cache_antigo(tabela: str):
+    """Último snapshot da aba, mesmo vencido"""
+    with _cache_lock:
+        item = _cache.get(tabela)
+    return None if item is None else item[1]
+
+# ===================================================
+# 🕒 DETECÇÃO DE MUDANÇAS (modifiedTime da planilha no Drive)
+# ===================================================
+# Uma consulta barata ao Drive (cota própria, não gasta leitura do Sheets) diz se
+# a planilha mudou desde que a aba foi baixada. Numa escrita nossa, só a aba
+# escrita leva a versão nova, e só se a planilha ainda estava na versão em que
+# a aba foi baixada logo antes de escrever; as demais conferem de novo.
+DETECTA_MUDANCAS = bool(_config("deteccao_mudancas", True))
+VERSAO_VALIDADE = 5.0     # segundos: uma consulta ao Drive serve todas as sessões
+MARCADOR_MAX_IDADE = float(_config("marcador_max_idade", 600))  # baixa de novo mesmo sem mudança
+
+_marcadores: dict = {}  # aba -> (versão da planilha antes da leitura, momento do download)
+_versao = (float("-inf"), None)  # (momento da consulta, modifiedTime)
+_versao_lock = threading.Lock()
+
+def _versao_planilha(forcar: bool = False):
+    """modifiedTime da planilha (None = detecção indisponível)"""
+    global _versao, DETECTA_MUDANCAS
+    if not DETECTA_MUDANCAS:
+        return None
+    with _versao_lock:
+        momento, valor = _versao
+        if not forcar and time.monotonic() - momento < VERSAO_VALIDADE:
+            return valor
+        try:
+            valor = _planilha().get_lastUpdateTime()
+        except APIError as e:
+            if getattr(e, "code", None) in (403, 404):
+                print(f"[conversa_banco] sem acesso ao Drive, detecção de mudanças desativada: {e}")
+                DETECTA_MUDANCAS = False
+            return None
+        _versao = (time.monotonic(), valor)
+        return valor
+
+def _inalterada(tabela: str) -> bool:
+    marcador = _marcadores.get(tabela)
+    if marcador is None or time.monotonic() - marcador[1] >= MARCADOR_MAX_IDADE:
+        return False
+    atual = _versao_planilha()
+    return atual is not None and atual == marcador[0]
+
+def _versao_antes_da_escrita():
+    """modifiedTime consultado agora, logo antes de uma escrita nossa
+    (a versão em cache pode ter minutos e esconder edições de outra pessoa)"""
+    if not DETECTA_MUDANCAS or not _marcadores:
+        return None
+    return _versao_planilha(forcar=True)
+
+def _escrita_propria(tabela: str, antes) -> None:
+    """Depois de uma escrita nossa na aba: se ela estava em dia logo antes da
+    escrita, continua em dia com a versão nova (a mudança é só a nossa)"""
+    if antes is None:
+        return
+    nova = _versao_planilha(forcar=True)
+    if nova is None or nova == antes:
+        return
+    with _cache_lock:
+        marcador = _marcadores.get(tabela)
+        if marcador is not None and marcador[0] == antes:
+            _marcadores[tabela] = (nova, marcador[1])
+
+def _le_com_fallback(abas: list, leitor) -> dict:
+    """Chama leitor(abas). Com a cota de leitura esgotada, devolve o último
+    snapshot de cada aba marcado como desatualizado em vez de travar a tela."""
+    antigas = {nome: _cache_antigo(nome) for nome in abas}
+    tem_todas = all(df is not None for df in antigas.values())
+    if tem_todas and _baldes["leitura"].espera() > 0:
+        return _desatualizadas(antigas)
+    try:
+        return _le_coalescido(abas, leitor)
+    except APIError as e:
+        if tem_todas and _eh_erro_de_cota(e):
+            return _desatualizadas(antigas)
+        raise
+
+# ===================================================
+# 🛫 LEITURAS EM VOO (single-flight)
+# ===================================================
+class _Voo:
+    """Leitura de uma aba em andamento; outras sessões esperam por ela"""
+
+    def __init__(self):
+        self.feito = threading.Event()
+        self.df = None
+        self.erro = None
+
+_voos: dict = {}  # aba -> _Voo
+_voos_lock = threading.Lock()
+
+def _le_coalescido(abas: list, leitor) -> dict:
+    """Chama leitor() só para as abas que ninguém está buscando agora;
+    para as demais, espera a leitura já em andamento e usa o resultado dela."""
+    minhas, alheias = {}, {}
+    with _voos_lock:
+        for nome in abas:
+            if nome in _voos:
+                alheias[nome] = _voos[nome]
+            else:
+                minhas[nome] = _voos[nome] = _Voo()
+
+    lidas = {}
+    if minhas:
+        try:
+            # Outra sessão pode ter acabado de encher o cache
+            for nome in list(minhas):
+                df = _cache_get(nome)
+                if df is not None:
+                    lidas[nome] = minhas.pop(nome).df = df
+            if minhas:
+                lidas.update(leitor(list(minhas)))
+                for nome, voo in minhas.items():
+                    voo.df = lidas.get(nome)
+        except BaseException as e:
+            for voo in minhas.values():
+                voo.erro = e
+            raise
+        finally:
+            with _voos_lock:
+                for nome in abas:
+                    if nome not in alheias:
+                        voo = _voos.pop(nome, None)
+                        if voo is not None:
+                            voo.feito.set()
+
+    for nome, voo in alheias.items():
+        voo.feito.wait()
+        if voo.erro is not None:
+            raise voo.erro
+        if voo.df is not None:
+            lidas[nome] = voo.df
+    return lidas
+
+def _desatualizadas(frames: dict) -> dict:
+    if _na_sessao():
+        st.toast("⏳ Limite do Google atingido: exibindo a última cópia dos dados.")
+    marcados = {}
+    for nome, df in frames.items():
+        df = df.copy()
+        df.attrs["desatualizado"] = True
+        marcados[nome] = df
+    return marcados
+
+def limpar_cache() -> None:
+    """Descarta o cache de todas as abas"""
+    with _cache_lock:
+        _cache.clear()
+        _marcadores.clear()
+        _projecoes.clear()
+        _tipados.clear()
+        _bases_incrementais.clear()
+
+# ===================================================
+# 💾 SNAPSHOT PARQUET (partida a frio)
+# ===================================================
+# Cada leitura bem-sucedida grava a aba em disco (em segundo plano). Depois de
+# reiniciar o processo, a primeira leitura de uma aba sai do snapshot na hora
+# e a planilha é relida em segundo plano para atualizá-lo.
+SNAPSHOT_DIR = _config("snapshot_dir", "dados/snapshot")
+COLUNAS_CATEGORICAS = tuple(DOMINIOS)
+
+_tipos_vistos: dict = {}  # aba -> tipos_colunas da última leitura (diz quais colunas são data)
+_gravador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+
+def _arquivo_snapshot(tabela: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, re.sub(r'[\\/:*?"<>|]', "_", tabela) + ".parquet")
+
+def _so_numeros(serie: pd.Series) -> bool:
+    return serie.map(lambda v: v == "" or (isinstance(v, (int, float)) and not isinstance(v, bool))).all()
+
+def _para_parquet(df: pd.DataFrame, tipos_colunas: dict) -> pd.DataFrame:
+    """Colunas tipadas: datas em datetime64, categorias, números com NaN no vazio"""
+    tipado = {}
+    for col in df.columns:
+        serie = df[col]
+        if tipos_colunas.get(col) == "data":
+            tipado[col] = para_datas(serie)
+        elif col in COLUNAS_CATEGORICAS:
+            tipado[col] = serie.astype(str).astype("category")
+        elif serie.dtype == object and _so_numeros(serie):
+            tipado[col] = pd.to_numeric(serie.replace("", None), errors="coerce")
+        elif serie.dtype == object:
+            tipado[col] = serie.astype(str)
+        else:
+            tipado[col] = serie
+    return pd.DataFrame(tipado, columns=df.columns)
+
+def _celulas(serie: pd.Series) -> pd.Series:
+    """Número (com NaN) -> como o Sheets devolve: int se inteiro, "" se vazio"""
+    numeros = serie.to_numpy(dtype="float64")
+    saida = serie.to_numpy(dtype=object, na_value="")
+    inteiro = ~np.isnan(numeros) & (numeros % 1 == 0)
+    saida[inteiro] = numeros[inteiro].astype("int64").astype(object)
+    return pd.Series(saida, index=serie.index)
+
+def _de_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Volta à representação crua das leituras (datas como serial do Sheets)"""
+    cru = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            cru[col] = _celulas((serie - _ORIGEM_SERIAL) / pd.Timedelta(days=1))
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            cru[col] = serie.astype(object)
+        elif pd.api.types.is_float_dtype(serie):
+            cru[col] = _celulas(serie)
+        else:
+            cru[col] = serie
+    return pd.DataFrame(cru, columns=df.columns)
+
+def _escreve_snapshot(tabela: str, df: pd.DataFrame) -> None:
+    try:
+        arquivo = _arquivo_snapshot(tabela)
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        temporario = arquivo + ".tmp"
+        _para_parquet(df, _tipos_vistos.get(tabela, {})).to_parquet(
+            temporario, compression="zstd", index=False
+        )
+        os.replace(temporario, arquivo)  # quem lê nunca pega arquivo pela metade
+    except Exception as e:
+        print(f"[conversa_banco] snapshot de {tabela} não gravado: {e}")
+
+def _grava_snapshot(tabela: str, df: pd.DataFrame) -> None:
+    _gravador.submit(_escreve_snapshot, tabela, df)
+
+def _le_snapshot(tabela: str):
+    try:
+        return _de_parquet(pd.read_parquet(_arquivo_snapshot(tabela)))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[conversa_banco] snapshot de {tabela} ignorado: {e}")
+        return None
+
+def _revalida(abas: list) -> None:
+    try:
+        _le_abas(abas)  # atualiza cache e snapshot
+    except Exception as e:
+        print(f"[conversa_banco] revalidação de {abas} falhou: {e}")
+
+def _do_disco(abas: list) -> dict:
+    """Abas nunca lidas neste processo saem do snapshot; a planilha é relida em segundo plano"""
+    with _cache_lock:
+        frias = [nome for nome in abas if nome not in _cache]
+    lidas = {}
+    for nome in frias:
+        df = _le_snapshot(nome)
+        if df is not None:
+            _cache_set(nome, df, grava_snapshot=False)
+            lidas[nome] = df
+    if lidas:
+        threading.Thread(
+            target=_revalida, args=(list(lidas),), name="revalida-snapshot", daemon=True
+        ).start()
+    return lidas
+
 # ===================================================
 # 🟩 SELECT
 # ===================================================
-@retry_api_error
-def select_protocolos(tipos_colunas: dict) -> pd.DataFrame:
-    """Lê somente abas de cidades (protocolos) e concatena em um único DataFrame"""
-    # Lista de abas válidas (cidades)
-    abas_validas = [
-        "Porangatu", "Santa Tereza", "Estrela do Norte", "Formoso",
-        "Trombas", "Novo Planalto", "Montividiu", "Mutunópolis"
+# Abas de cidades (protocolos)
+ABAS_PROTOCOLOS = list(CIDADES)
+
+# Texto que o numericise do gspread pode virar número: só dígitos, sinais,
+# separadores e expoente (ou nan/inf). O resto nunca muda e nem é testado.
+_PARECE_NUMERO = re.compile(r"[\s\d,.eE+\-]*\d[\s\d,.eE+\-]*|\s*[+-]?(nan|inf|infinity)\s*", re.IGNORECASE)
+
+def _numericise_coluna(valores) -> pd.Series:
+    """O numericise que o get_all_records faz célula a célula, aplicado por coluna"""
+    serie = pd.Series(valores, dtype=object)
+    if pd.api.types.infer_dtype(serie, skipna=True) in ("string", "mixed", "mixed-integer"):
+        candidatos = serie.str.fullmatch(_PARECE_NUMERO, na=False).to_numpy(dtype=bool)
+        if candidatos.any():
+            serie[candidatos] = serie[candidatos].map(numericise).astype(object)
+    return serie.infer_objects()
+
+def _valores_para_df(valores: list) -> pd.DataFrame:
+    """Monta o DataFrame a partir dos valores crus da aba (linha 1 = cabeçalho),
+    com o mesmo resultado de get_all_records, mas coluna a coluna: sem um dict
+    por linha e com a conversão de números só nas células de texto"""
+    if not valores or not valores[0]:
+        return pd.DataFrame()
+    largura = max(len(linha) for linha in valores)
+    header = list(valores[0]) + [""] * (largura - len(valores[0]))
+    if len(set(header)) != len(header):
+        raise ValueError(f"Cabeçalho com colunas duplicadas: {header}")
+    linhas = [
+        linha if len(linha) == largura else list(linha) + [""] * (largura - len(linha))
+        for linha in valores[1:]
     ]
+    colunas = zip(*linhas) if linhas else [()] * largura
+    return pd.DataFrame(
+        {h: _numericise_coluna(coluna) for h, coluna in zip(header, colunas)}, columns=header,
+    ).rename(columns=str.strip)
+
+# ===================================================
+# ➕ LEITURA INCREMENTAL (só as linhas novas no fim)
+# ===================================================
+# Abas que crescem pelo fim: em vez de baixar tudo, uma requisição traz o
+# cabeçalho, a coluna ID e as linhas depois das que já temos. Se o cabeçalho e
+# o checksum dos IDs conferem, as linhas novas são anexadas ao frame em cache.
+# Edições no meio da aba feitas fora do app só aparecem na leitura completa,
+# que é forçada a cada INCREMENTAL_MAX_IDADE segundos.
+ABAS_INCREMENTAIS = ABAS_PROTOCOLOS + ["eventos", "painel_financeiro"]
+LEITURA_INCREMENTAL = bool(_config("leitura_incremental", True))
+INCREMENTAL_MAX_IDADE = float(_config("incremental_max_idade", 900))
 
-    df_final = pd.DataFrame()
+_bases_incrementais: dict = {}  # aba -> momento da última leitura completa
 
-    for nome in abas_validas:
-        try:
-            aba = _sheet.worksheet(nome)
-            registros = aba.get_all_records(value_render_option="UNFORMATTED_VALUE")
-            if not registros:
-                continue
+def _checksum_ids(ids) -> str:
+    return hashlib.sha1("\x1f".join(_chave_id(v) for v in ids).encode("utf-8")).hexdigest()
+
+def _base_incremental(nome: str):
+    """Frame em cache que pode receber só a cauda (ou None)"""
+    if not LEITURA_INCREMENTAL or nome not in ABAS_INCREMENTAIS:
+        return None
+    with _cache_lock:
+        momento = _bases_incrementais.get(nome)
+        item = _cache.get(nome)
+    if momento is None or item is None or time.monotonic() - momento >= INCREMENTAL_MAX_IDADE:
+        return None
+    df = item[1]
+    return df if "ID" in df.columns and len(df.columns) else None
 
-            df = pd.DataFrame(registros).rename(columns=str.strip)
-            df["Cidade"] = nome  # ✅ adiciona cidade, útil no código
-            df_final = pd.concat([df_final, df], ignore_index=True)
+def _le_caudas(abas: list) -> dict:
+    """Atualiza pelo fim as abas elegíveis, todas em uma requisição"""
+    bases = {nome: _base_incremental(nome) for nome in abas}
+    bases = {nome: df for nome, df in bases.items() if df is not None}
+    if not bases:
+        return {}
+
+    faixas = []
+    for nome, df in bases.items():
+        ultima = rowcol_to_a1(1, len(df.columns))[:-1]     # letra da última coluna
+        col_id = rowcol_to_a1(1, list(df.columns).index("ID") + 1)[:-1]
+        faixas += [
+            absolute_range_name(nome, "1:1"),
+            absolute_range_name(nome, f"{col_id}2:{col_id}"),
+            absolute_range_name(nome, f"A{len(df) + 2}:{ultima}"),
+        ]
+    marca = _versao_planilha()
+    try:
+        resposta = _planilha().values_batch_get(
+            faixas, params={"valueRenderOption": "UNFORMATTED_VALUE"}
+        )
+    except APIError as e:
+        if _eh_erro_de_cota(e):
+            raise
+        return {}  # aba renomeada/apagada: a leitura completa dá o erro certo
+    valores = [faixa.get("values", []) for faixa in resposta.get("valueRanges", [])]
+
+    lidas = {}
+    for i, (nome, df) in enumerate(bases.items()):
+        cabecalho, coluna_id, cauda = valores[3 * i: 3 * i + 3]
+        cabecalho = [str(h).strip() for h in (cabecalho[0] if cabecalho else [])]
+        ids = [linha[0] if linha else "" for linha in coluna_id][:len(df)]
+        ids += [""] * (len(df) - len(ids))
+        if cabecalho != list(df.columns) or _checksum_ids(ids) != _checksum_ids(df["ID"]):
+            continue  # linhas apagadas, reordenadas ou colunas mudaram: leitura completa
+        if cauda:
+            novas = _valores_para_df([cabecalho] + cauda)
+            df = pd.concat([df, novas], ignore_index=True)
+        _cache_set(nome, df, marca=marca)
+        lidas[nome] = df
+    return lidas
+
+def _le_abas(abas: list) -> dict:
+    """Lê várias abas em uma única requisição e devolve {aba: DataFrame cru}"""
+    # ✅ Só pede as abas que existem (uma falta derrubaria o lote inteiro)
+    titulos = _titulos_abas()
+    abas = [nome for nome in abas if nome in titulos]
+    if not abas:
+        return {}
+
+    lidas = _le_caudas(abas)
+    abas = [nome for nome in abas if nome not in lidas]
+    if not abas:
+        return lidas
+
+    marca = _versao_planilha()
+    resposta = _planilha().values_batch_get(
+        [absolute_range_name(nome) for nome in abas],
+        params={"valueRenderOption": "UNFORMATTED_VALUE"},
+    )
+
+    for nome, faixa in zip(abas, resposta.get("valueRanges", [])):
+        valores = faixa.get("values", [])
+        try:
+            lidas[nome] = _valores_para_df(valores)
         except Exception:
             continue
+        _guarda_cabecalho(nome, valores)
+        _cache_set(nome, lidas[nome], marca=marca)
+        _marca_leitura_completa(nome)
+    return lidas
+
+def _marca_leitura_completa(nome: str) -> None:
+    with _cache_lock:
+        _bases_incrementais[nome] = time.monotonic()
+
+def _frames_completos(abas: list) -> dict:
+    """{aba: DataFrame cru} do cache, do snapshot ou da planilha"""
+    frames = {nome: _cache_get(nome) for nome in abas}
+
+    # ✅ Todas as abas vencidas em uma única requisição
+    faltando = [nome for nome, df in frames.items() if df is None]
+    if faltando:
+        frames.update(_do_disco(faltando))
+        faltando = [nome for nome in faltando if frames.get(nome) is None]
+    if faltando:
+        frames.update(_le_com_fallback(faltando, _le_abas))
+    return frames
+
+def _concatena_protocolos(frames: dict) -> pd.DataFrame:
+    lista_df = []
+    for nome in ABAS_PROTOCOLOS:
+        df = frames.get(nome)
+        if df is None or df.empty:
+            continue
+        df = df.copy()
+        df["Cidade"] = nome  # ✅ adiciona cidade, útil no código
+        lista_df.append(df)
+
+    df_final = pd.concat(lista_df, ignore_index=True) if lista_df else pd.DataFrame()
+    if any(df.attrs.get("desatualizado") for df in lista_df):
+        df_final.attrs["desatualizado"] = True
+    return df_final
+
+def _sheets_select_protocolos(tipos_colunas, colunas: list = None) -> pd.DataFrame:
+    """Lê somente abas de cidades (protocolos) e concatena em um único DataFrame"""
+    esquema = esquema_de(tipos_colunas, ABAS_PROTOCOLOS[0])
+    for nome in ABAS_PROTOCOLOS:
+        _tipos_vistos[nome] = esquema
+    if colunas is None:
+        frames = _frames_completos(ABAS_PROTOCOLOS)
+    else:
+        frames = _frames_projetados(ABAS_PROTOCOLOS, colunas, _frames_completos)
+    frames = _sobrepoe_pendentes(frames, colunas)
+    crus = [frames.get(nome) for nome in ABAS_PROTOCOLOS]
+    return _tipado(("protocolos", esquema, colunas and tuple(colunas)), crus, esquema,
+                   lambda: _concatena_protocolos(frames))
+
+def _le_aba(tabela: str) -> pd.DataFrame:
+    lidas = _le_caudas([tabela])
+    if tabela in lidas:
+        return lidas[tabela]
+    ws = _aba(tabela)
+    marca = _versao_planilha()
+    # ✅ Valores crus (uma lista por linha) em vez de um dict por linha do get_all_records
+    valores = ws.get(value_render_option=ValueRenderOption.unformatted)
+    df = _valores_para_df(valores)
+    _guarda_cabecalho(tabela, valores)
+    _cache_set(tabela, df, marca=marca)
+    _marca_leitura_completa(tabela)
+    return df
+
+def _frame_aba(tabela: str) -> pd.DataFrame:
+    df = _cache_get(tabela)
+    if df is None:
+        df = _do_disco([tabela]).get(tabela)
+    if df is None:
+        df = _le_com_fallback([tabela], lambda abas: {tabela: _le_aba(tabela)})[tabela]
+    return df
+
+def _sheets_select_aba(tabela: str, tipos_colunas, colunas: list = None) -> pd.DataFrame:
+    """Lê uma única aba da planilha (via cache compartilhado)"""
+    esquema = esquema_de(tipos_colunas, tabela)
+    _tipos_vistos[tabela] = esquema
+    if colunas is None:
+        df = _frame_aba(tabela)
+    else:
+        df = _frames_projetados([tabela], colunas, lambda abas: {tabela: _frame_aba(tabela)})[tabela]
+    df = _sobrepoe_pendentes({tabela: df}, colunas)[tabela]
+    return _tipado((tabela, esquema, colunas and tuple(colunas)), [df], esquema, lambda: df)
+
+# ===================================================
+# 🧪 CONVERSÃO DE TIPOS (uma vez por leitura)
+# ===================================================
+# O cache guarda o DataFrame cru; a conversão pelo esquema é refeita só quando
+# a leitura por trás muda (mesmos objetos crus = mesmo resultado tipado).
+_tipados: dict = {}  # (aba, esquema, colunas) -> (frames crus de origem, DataFrame tipado)
+
+def _tipado(chave: tuple, crus: list, esquema: Esquema, monta) -> pd.DataFrame:
+    with _cache_lock:
+        item = _tipados.get(chave)
+    if item is None or len(item[0]) != len(crus) or any(a is not b for a, b in zip(item[0], crus)):
+        cru = monta()
+        item = (crus, esquema.converte(cru))
+        with _cache_lock:
+            _tipados[chave] = item
+    tipado = item[1].copy()
+    tipado.attrs = {k: v for k, v in tipado.attrs.items() if k != "desatualizado"}
+    if any(df is not None and df.attrs.get("desatualizado") for df in crus):
+        tipado.attrs["desatualizado"] = True
+    return tipado
+
+# ===================================================
+# ✂️ PROJEÇÃO DE COLUNAS (select(..., colunas=[...]))
+# ===================================================
+# Com a aba inteira em cache, a projeção é só um recorte. Senão, baixa apenas
+# os intervalos de colunas pedidos (posições pelo cabeçalho em cache), numa
+# requisição para todas as abas, e guarda o resultado com o mesmo TTL.
+_projecoes: dict = {}  # (aba, colunas) -> (momento da leitura, DataFrame cru projetado)
+
+def _recorta(df: pd.DataFrame, colunas: tuple) -> pd.DataFrame:
+    return df[[c for c in colunas if c in df.columns]]
+
+def _projecao_em_cache(nome: str, colunas: tuple):
+    df = _cache_get(nome)
+    if df is not None:
+        return _recorta(df, colunas)
+    with _cache_lock:
+        item = _projecoes.get((nome, colunas))
+    if item is None or time.monotonic() - item[0] >= CACHE_TTL:
+        return None
+    return item[1]
+
+def _cabecalhos_de(abas: list) -> dict:
+    """{aba: nomes das colunas}, buscando de uma vez só os que ninguém conhece"""
+    conhecidos = {}
+    for nome in abas:
+        if nome in _cabecalhos:
+            conhecidos[nome] = [str(h).strip() for h in _cabecalhos[nome]]
+        else:
+            df = _cache_antigo(nome)
+            if df is not None and len(df.columns):
+                conhecidos[nome] = list(df.columns)
+    faltando = [nome for nome in abas if nome not in conhecidos]
+    if faltando:
+        resposta = _planilha().values_batch_get(
+            [absolute_range_name(nome, "1:1") for nome in faltando],
+            params={"valueRenderOption": "UNFORMATTED_VALUE"},
+        )
+        for nome, faixa in zip(faltando, resposta.get("valueRanges", [])):
+            linha = (faixa.get("values") or [[]])[0]
+            _cabecalhos[nome] = linha
+            conhecidos[nome] = [str(h).strip() for h in linha]
+    return conhecidos
+
+def _le_projecoes(abas: list, colunas: tuple) -> dict:
+    """Baixa só as colunas pedidas de cada aba, numa única requisição"""
+    titulos = _titulos_abas()
+    abas = [nome for nome in abas if nome in titulos]
+    if not abas:
+        return {}
+    cabecalhos = _cabecalhos_de(abas)
+
+    planos, faixas = {}, []
+    for nome in abas:
+        posicoes = sorted({cabecalhos[nome].index(c) + 1 for c in colunas if c in cabecalhos[nome]})
+        planos[nome] = (posicoes, _agrupa_intervalos(posicoes))
+        for inicio, fim in planos[nome][1]:
+            faixas.append(absolute_range_name(
+                nome, f"{rowcol_to_a1(1, inicio)[:-1]}:{rowcol_to_a1(1, fim)[:-1]}"
+            ))
+    blocos = iter([])
+    if faixas:
+        resposta = _planilha().values_batch_get(
+            faixas, params={"valueRenderOption": "UNFORMATTED_VALUE"}
+        )
+        blocos = iter([faixa.get("values", []) for faixa in resposta.get("valueRanges", [])])
+
+    lidas = {}
+    for nome, (posicoes, intervalos) in planos.items():
+        partes = [(next(blocos), fim - inicio + 1) for inicio, fim in intervalos]
+        altura = max((len(bloco) for bloco, _ in partes), default=0)
+        linhas = [
+            [v for bloco, largura in partes
+             for v in ((bloco[i] if i < len(bloco) else []) + [""] * largura)[:largura]]
+            for i in range(altura)
+        ]
+        esperado = [cabecalhos[nome][p - 1] for p in posicoes]
+        if linhas and [str(h).strip() for h in linhas[0]] != esperado:
+            _cabecalhos.pop(nome, None)  # cabeçalho mudou: leitura completa
+            continue
+        df = _recorta(_valores_para_df(linhas), colunas) if linhas else pd.DataFrame()
+        with _cache_lock:
+            _projecoes[(nome, colunas)] = (time.monotonic(), df)
+        lidas[nome] = df
+    return lidas
 
-    return _scale(df_final, tipos_colunas, "mostrar")
-@retry_api_error
+def _frames_projetados(abas: list, colunas: list, completos) -> dict:
+    """{aba: DataFrame cru só com `colunas`}; `completos(abas)` é o plano B"""
+    colunas = tuple(colunas)
+    frames = {nome: _projecao_em_cache(nome, colunas) for nome in abas}
+    faltando = [nome for nome, df in frames.items() if df is None]
+    if faltando:
+        frames.update(_le_projecoes(faltando, colunas))
+        faltando = [nome for nome in faltando if frames.get(nome) is None]
+    if faltando:
+        # Aba que não existe na planilha volta None, como na leitura sem projeção
+        frames.update({nome: _recorta(df, colunas) for nome, df in completos(faltando).items()
+                       if df is not None})
+    return frames
 
-def select_aba(tabela: str, tipos_colunas: dict) -> pd.DataFrame:
-    """Lê uma única aba da planilha"""
-    ws = _sheet.worksheet(tabela)
-    registros = ws.get_all_records(value_render_option="UNFORMATTED_VALUE")
-    df = pd.DataFrame(registros).rename(columns=str.strip)
-    return _scale(df, tipos_colunas, "mostrar")
 
+# ===================================================
+# 🧾 CABEÇALHO (cache por aba)
+# ===================================================
+_cabecalhos: dict = {}
+
+def _guarda_cabecalho(nome: str, valores: list) -> None:
+    """Leitura completa já trouxe a linha 1: o cabeçalho em cache passa a ser ela
+    (coluna criada ou renomeada por fora aparece sem esperar o processo reiniciar)"""
+    _cabecalhos[nome] = list(valores[0]) if valores else []
+
+def _cabecalho(ws) -> list:
+    """Cabeçalho (linha 1) da aba; lido à parte só se nenhuma leitura completa o trouxe"""
+    if ws.title not in _cabecalhos:
+        _cabecalhos[ws.title] = ws.row_values(1)
+    return _cabecalhos[ws.title]
+
+def _mapa_colunas(ws) -> dict:
+    """{nome da coluna em minúsculas: posição (1-based)} a partir do cabeçalho"""
+    return {str(h).strip().lower(): i + 1 for i, h in enumerate(_cabecalho(ws))}
+
+# ===================================================
+# 🔎 ÍNDICE ID → LINHA (por aba)
+# ===================================================
+# Construído a partir da leitura em cache e mantido pelos nossos próprios
+# inserts/deletes. Antes de escrever, a linha é conferida lendo só a célula
+# de ID; se não bater, o índice é refeito a partir da coluna ID.
+_indices: dict = {}  # aba -> {ID: [linhas da planilha]}
+_indice_lock = threading.Lock()
+
+def _chave_id(v) -> str:
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return str(v).strip()
+
+def _define_indice(tabela: str, ids: list, primeira_linha: int = 2) -> dict:
+    indice: dict = {}
+    for lin, v in enumerate(ids, start=primeira_linha):
+        if _chave_id(v):
+            indice.setdefault(_chave_id(v), []).append(lin)
+    with _indice_lock:
+        _indices[tabela] = indice
+    return indice
+
+def _indice_adiciona(tabela: str, ids: list, primeira_linha: int) -> None:
+    with _indice_lock:
+        indice = _indices.get(tabela)
+        if indice is None:
+            return
+        for lin, v in enumerate(ids, start=primeira_linha):
+            indice.setdefault(_chave_id(v), []).append(lin)
+
+def _indice_remove_linhas(tabela: str, linhas: list) -> None:
+    """Tira as linhas apagadas do índice e desloca as que estavam abaixo delas"""
+    apagadas = sorted(set(linhas))
+    with _indice_lock:
+        indice = _indices.get(tabela)
+        if indice is None or not apagadas:
+            return
+        novo = {}
+        for chave, lins in indice.items():
+            restantes = [
+                lin - bisect.bisect_left(apagadas, lin)
+                for lin in lins if lin not in apagadas
+            ]
+            if restantes:
+                novo[chave] = restantes
+        _indices[tabela] = novo
+
+def _reconstroi_indice(ws, tabela: str) -> dict:
+    """Refaz o índice lendo só a coluna ID (cabeçalho relido junto)"""
+    _cabecalhos.pop(ws.title, None)
+    col_id = _mapa_colunas(ws).get("id")
+    if col_id is None:
+        raise KeyError("ID")
+    valores = ws.col_values(col_id, value_render_option="UNFORMATTED_VALUE")
+    return _define_indice(tabela, valores[1:])
+
+def _confere_linhas(ws, linhas: list, alvos: set) -> bool:
+    """Leitura barata: confirma que as linhas ainda têm esses IDs"""
+    col_id = _mapa_colunas(ws).get("id")
+    if col_id is None:
+        return False
+    faixas = ws.batch_get(
+        [rowcol_to_a1(lin, col_id) for lin in linhas],
+        value_render_option="UNFORMATTED_VALUE",
+    )
+    for faixa in faixas:
+        valor = faixa[0][0] if faixa and faixa[0] else ""
+        if _chave_id(valor) not in alvos:
+            return False
+    return True
+
+def _linhas_dos_ids(ws, tabela: str, ids: list) -> list:
+    """Linhas da planilha com esses IDs, sem baixar a aba inteira"""
+    alvos = {_chave_id(i) for i in ids}
+    with _indice_lock:
+        indice = _indices.get(tabela)
+    if indice is None:
+        with _cache_lock:
+            item = _cache.get(tabela)  # mesmo vencido, serve de ponto de partida
+        if item is not None and "ID" in item[1].columns:
+            indice = _define_indice(tabela, item[1]["ID"].tolist())
+    if indice is not None and all(a in indice for a in alvos):
+        linhas = sorted(lin for a in alvos for lin in indice[a])
+        if _confere_linhas(ws, linhas, alvos):
+            return linhas
+    indice = _reconstroi_indice(ws, tabela)
+    return sorted(lin for a in alvos for lin in indice.get(a, []))
+
+# ===================================================
+# 🎯 WHERE (filtros declarativos)
+# ===================================================
+# `where` aceita um Filtro, uma lista deles (valem todos juntos) ou o texto
+# antigo "campo,op,valor" (sempre igualdade). Os filtros rodam vetorizados
+# sobre o DataFrame; igualdade por ID em update/delete usa o índice ID -> linha.
+_NUMERO = re.compile(r"-?\d+(\.\d+)?")
+
+def _candidatos(valor) -> list:
+    """O valor como texto e como número: a planilha devolve "1" como 1"""
+    texto = str(valor).strip()
+    candidatos = [texto]
+    if _NUMERO.fullmatch(texto):  # float() aceitaria "2025_1" e IDs gigantes
+        numero = float(texto)
+        if numero.is_integer() and abs(numero) < 2 ** 63:
+            candidatos.append(int(numero))
+        else:
+            candidatos.append(numero)
+    elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        candidatos.append(valor)
+    return candidatos
+
+def _limite(valor):
+    """Limite do entre(): número fica número; o resto vira data (dd/mm/aaaa)"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor
+    return pd.to_datetime(valor, dayfirst=True)
+
+class Filtro:
+    """Predicado sobre uma coluna (nome sem diferenciar maiúsculas).
+    Crie com eq(), em(), entre() ou contem()."""
+
+    def __init__(self, campo: str, op: str, valores: list):
+        self.campo = str(campo).strip()
+        self.op = op
+        self.valores = list(valores)
+
+    def __repr__(self):
+        return f"Filtro({self.campo!r}, {self.op!r}, {self.valores!r})"
+
+    def mascara(self, df: pd.DataFrame) -> pd.Series:
+        serie = df[_map_cols(df)[self.campo.lower()]]
+        datas = pd.api.types.is_datetime64_any_dtype(serie)
+        if self.op == "em" and datas:
+            # "15/03/2023", serial ou Timestamp: compara como data
+            return serie.isin(para_datas(pd.Series(self.valores, dtype=object)).dropna())
+        if self.op == "em":
+            candidatos = [c for v in self.valores for c in _candidatos(v)]
+            textos = [c for c in candidatos if isinstance(c, str)]
+            numeros = [c for c in candidatos if not isinstance(c, str)]
+            mascara = serie.astype(str).str.strip().isin(textos)
+            if numeros:
+                mascara |= pd.to_numeric(serie, errors="coerce").isin(numeros)
+            return mascara
+        if self.op == "entre":
+            minimo, maximo = self.valores
+            limites = [v for v in self.valores if v is not None]
+            if all(isinstance(v, (int, float)) for v in limites):
+                serie = pd.to_numeric(serie, errors="coerce")
+            else:
+                serie = para_datas(serie)
+            mascara = serie.notna()
+            if minimo is not None:
+                mascara &= serie >= minimo
+            if maximo is not None:
+                mascara &= serie <= maximo
+            return mascara
+        if self.op == "contem":
+            if datas:  # busca no texto como aparece na tela
+                serie = serie.dt.strftime(FORMATO_DATA)
+            return serie.astype(str).str.contains(self.valores[0], case=False, regex=False)
+        raise ValueError(f"Operador de filtro desconhecido: {self.op!r}")
+
+def eq(campo: str, valor) -> Filtro:
+    """campo == valor ("1" e 1 são iguais, como na planilha)"""
+    return Filtro(campo, "em", [valor])
+
+def em(campo: str, valores) -> Filtro:
+    """campo é um dos valores"""
+    return Filtro(campo, "em", valores)
+
+def entre(campo: str, minimo=None, maximo=None) -> Filtro:
+    """minimo <= campo <= maximo (inclusive; None deixa o lado aberto).
+    Números comparam como números; datas/textos dd/mm/aaaa como datas."""
+    return Filtro(campo, "entre", [
+        None if minimo is None else _limite(minimo),
+        None if maximo is None else _limite(maximo),
+    ])
+
+def contem(campo: str, texto: str) -> Filtro:
+    """campo contém o texto (sem diferenciar maiúsculas)"""
+    return Filtro(campo, "contem", [str(texto)])
+
+def _filtros(where) -> list:
+    """where (Filtro, lista ou "campo,op,valor") -> lista de Filtro"""
+    if where is None:
+        return []
+    if isinstance(where, str):
+        campo, _, alvo = [s.strip() for s in where.split(",", 2)]
+        return [eq(campo, alvo)]
+    if isinstance(where, Filtro):
+        return [where]
+    return list(where)
+
+def _mascara(df: pd.DataFrame, filtros: list) -> pd.Series:
+    mascara = pd.Series(True, index=df.index)
+    for filtro in filtros:
+        mascara &= filtro.mascara(df)
+    return mascara
+
+def _ids_do_filtro(filtros: list):
+    """Os IDs procurados, se o where é só igualdade por ID (dá para usar o índice)"""
+    if len(filtros) == 1 and filtros[0].op == "em" and filtros[0].campo.lower() == "id":
+        # Mesma regra das colunas de texto: 5.0 procura o ID "5", não "5.0"
+        return _texto(pd.Series(list(filtros[0].valores), dtype=object)).tolist()
+    return None
+
+def _linhas_onde(ws, tabela: str, where, tipos_colunas: dict):
+    """Devolve (linhas da planilha, {coluna minúscula: posição}) do filtro"""
+    filtros = _filtros(where)
+    ids = _ids_do_filtro(filtros)
+    if ids is not None:
+        # ✅ Filtro por ID: índice + conferência, sem ler a aba inteira
+        return _linhas_dos_ids(ws, tabela, ids), _mapa_colunas(ws)
+
+    df = _valores_para_df(ws.get(value_render_option=ValueRenderOption.unformatted))
+    if df.empty:
+        return [], {}
+    df = esquema_de(tipos_colunas, tabela).converte(df)
+    linhas = df.index[_mascara(df, filtros)]
+    return [i + 2 for i in linhas], {c.lower(): i + 1 for i, c in enumerate(df.columns)}
+
+# ─── Ordenação e limite do select ────────────────────────────────
+def _ordem(order_by) -> list:
+    """"Campo" / "-Campo" (decrescente) ou lista deles -> [(campo, crescente)]"""
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(c[1:], False) if c.startswith("-") else (c, True) for c in order_by]
+
+def _chave_ordenacao(serie: pd.Series) -> pd.Series:
+    """Números como números, datas dd/mm/aaaa como datas, o resto como texto"""
+    if pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        return serie  # já tipada pelo esquema (células vazias = NaN/NaT, vão para o fim)
+    vazias = serie.isna() | (serie.astype(str).str.strip() == "")
+    numeros = pd.to_numeric(serie, errors="coerce")
+    if (numeros.notna() | vazias).all():
+        return numeros
+    datas = pd.to_datetime(serie.where(~vazias), format="%d/%m/%Y", errors="coerce")
+    if (datas.notna() | vazias).all():
+        return datas
+    return serie.astype(str).str.lower()
+
+def _consulta(df: pd.DataFrame, filtros: list, ordem: list, limit, extras: list) -> pd.DataFrame:
+    """Aplica where / order_by / limit e tira as colunas lidas só para isso"""
+    if filtros:
+        df = df[_mascara(df, filtros)]
+    if ordem:
+        nomes = _map_cols(df)
+        df = df.sort_values(
+            [nomes[c.lower()] for c, _ in ordem],
+            ascending=[crescente for _, crescente in ordem],
+            key=_chave_ordenacao, kind="stable",
+        )
+    if limit is not None:
+        df = df.head(limit)
+    if extras:
+        df = df.drop(columns=[c for c in extras if c in df.columns])
+    return df.reset_index(drop=True) if filtros or ordem else df
+
+def _colunas_da_consulta(colunas, filtros: list, ordem: list) -> tuple:
+    """(colunas a ler, colunas lidas só para filtrar/ordenar)"""
+    if colunas is None:
+        return None, []
+    extras = [f.campo for f in filtros] + [c for c, _ in ordem]
+    extras = [c for c in dict.fromkeys(extras) if c not in colunas]
+    return list(colunas) + extras, extras
 
 # ===================================================
 # 🟦 INSERT
 # ===================================================
-@retry_api_error
-def insert(tabela: str, dados):
-    ws = _sheet.worksheet(tabela)
+def _registros_com_id(dados) -> list:
+    """dict / lista de dicts / DataFrame -> lista de dicts, gerando ID onde faltar"""
     if isinstance(dados, pd.DataFrame):
         dados = dados.to_dict("records")
     if isinstance(dados, dict):
@@ -127,75 +1372,580 @@ def insert(tabela: str, dados):
     for i, item in enumerate(dados, start=1):
         if not item.get("ID"):
             item["ID"] = cria_id(sequencia=str(i))
-    df = pd.DataFrame(dados)
-    header = ws.row_values(1) or list(df.columns)
-    if not ws.row_values(1):
-        ws.insert_row(header, 1)
+    return dados
+
+def _garante_colunas(ws, colunas) -> list:
+    """Cabeçalho da aba, acrescentando as colunas que ainda não existem"""
+    header = list(_cabecalho(ws))
+    novas = [c for c in dict.fromkeys(colunas) if c not in header]
+    if novas:
+        # ✅ Só reescreve o cabeçalho quando aparece coluna nova
+        header += novas
+        ws.update(range_name="A1", values=[header])
+        _cabecalhos[ws.title] = header
+    return header
+
+def _sheets_insert(tabela: str, dados, tipos_colunas: dict = None):
+    ws = _aba(tabela)
+    df = pd.DataFrame(_registros_com_id(dados))
+    antes = _versao_antes_da_escrita()
+    header = _garante_colunas(ws, df.columns)
+    linhas = [[_valor_celula(r.get(h, "")) for h in header] for r in df.to_dict("records")]
+    # ✅ Append no servidor: não precisa ler a aba para achar a próxima linha
+    resposta = ws.append_rows(linhas, insert_data_option=InsertDataOption.insert_rows, table_range="A1")
+    faixa = resposta.get("updates", {}).get("updatedRange", "")
+    if "!" in faixa:
+        primeira = a1_to_rowcol(faixa.split("!")[-1].split(":")[0])[0]
+        _indice_adiciona(tabela, [r.get("ID", "") for r in df.to_dict("records")], primeira)
     else:
-        for c in df.columns:
-            if c not in header:
-                header.append(c)
-        ws.update("A1", [header])
-    linhas = [[r.get(h, "") for h in header] for r in df.to_dict("records")]
-    ws.insert_rows(linhas, row=len(ws.get_all_values()) + 1)
+        with _indice_lock:
+            _indices.pop(tabela, None)
+    registros = df.to_dict("records")
+    _aplica_no_cache(tabela, lambda base: _frame_com_insert(base, registros, ignora_existentes=False),
+                     antes=antes)
 
 # ===================================================
 # 🟨 UPDATE
 # ===================================================
-@retry_api_error
-def update(tabela: str, campos: list, valores: list, where: str, tipos_colunas: dict) -> int:
-    ws = _sheet.worksheet(tabela)
-    df = pd.DataFrame(ws.get_all_records()).rename(columns=str.strip)
-    if df.empty:
-        return 0
-    df = _scale(df, tipos_colunas, "gravar")
-    col_map = _map_cols(df)
-    campo, _, alvo = [s.strip() for s in where.split(",")]
-    real = col_map[campo.lower()]
-    if tipos_colunas.get(real) == "numero100":
-        try:
-            alvo = str(float(alvo))
-        except Exception:
-            pass
-    linhas = df.index[df[real].astype(str) == str(alvo)]
-    if linhas.empty:
+def _sheets_update(tabela: str, campos: list, valores: list, where: str, tipos_colunas: dict) -> int:
+    ws = _aba(tabela)
+    filtros = _filtros(where)
+    linhas, colunas = _linhas_onde(ws, tabela, filtros, tipos_colunas)
+    if not linhas:
         return 0
+    celulas = []
     for lin in linhas:
         for c, v in zip(campos, valores):
-            real_c = col_map[c.lower()]
-            ws.update_cell(lin + 2, df.columns.get_loc(real_c) + 1, v)
+            celulas.append({
+                "range": rowcol_to_a1(lin, colunas[c.lower()]),
+                "values": [[_valor_celula(v)]],
+            })
+    # ✅ Uma única escrita em lote por aba (em vez de update_cell por célula)
+    antes = _versao_antes_da_escrita()
+    ws.batch_update(celulas, value_input_option=ValueInputOption.user_entered)
+    if any(c.lower() == "id" for c in campos):
+        with _indice_lock:
+            _indices.pop(tabela, None)
+    _aplica_no_cache(
+        tabela, lambda base: _frame_com_update(base, campos, valores, filtros, tabela),
+        [f.campo for f in filtros], antes,
+    )
     return len(linhas)
 
+# ===================================================
+# 🔁 UPSERT (um lote inteiro pela chave)
+# ===================================================
+# Compara o lote com a leitura em cache: linhas iguais não são escritas, as
+# células alteradas vão num único batch_update e as linhas novas num único append.
+def _registros(dados) -> list:
+    """dict / lista de dicts / DataFrame -> lista de dicts"""
+    if isinstance(dados, pd.DataFrame):
+        return dados.to_dict("records")
+    if isinstance(dados, dict):
+        return [dados]
+    return list(dados)
+
+def _mesmo_valor(novo, atual) -> bool:
+    """Igualdade como a planilha vê: "1", 1 e 1.0 são o mesmo valor"""
+    a, b = _candidatos(_valor_celula(novo)), _candidatos(_valor_celula(atual))
+    if len(a) > 1 and len(b) > 1:
+        return a[1] == b[1]
+    return a[0] == b[0]
+
+def _diferencas(base: pd.DataFrame, registros: list, key: str) -> list:
+    """[(registro, {coluna: novo valor} ou None se a chave não existe)]"""
+    nomes = _map_cols(base)
+    real = nomes.get(key.lower())
+    atuais = {}
+    if real is not None:
+        for linha in base.to_dict("records"):
+            atuais.setdefault(_chave_id(linha[real]), linha)
+    saida = []
+    for registro in registros:
+        chave = _chave_id(_valor_celula(registro.get(key, "")))
+        atual = atuais.get(chave) if chave else None
+        if atual is None:
+            saida.append((registro, None))
+            continue
+        saida.append((registro, {
+            nomes.get(c.lower(), c): v for c, v in registro.items()
+            if c.lower() != key.lower() and not _mesmo_valor(v, atual.get(nomes.get(c.lower()), ""))
+        }))
+    return saida
+
+def _resultado_upsert(registros: list, key: str, estados: list) -> pd.DataFrame:
+    return pd.DataFrame({key: [r.get(key, "") for r in registros], "resultado": estados})
+
+def _linhas_por_chave(ws, tabela: str, key: str, valores: list) -> dict:
+    """{chave: [linhas da planilha]}; por ID usa (e confere) o índice"""
+    if not valores:
+        return {}
+    if key.lower() == "id":
+        _linhas_dos_ids(ws, tabela, valores)
+        with _indice_lock:
+            indice = dict(_indices.get(tabela, {}))
+    else:
+        coluna = _mapa_colunas(ws)[key.lower()]
+        todos = ws.col_values(coluna, value_render_option="UNFORMATTED_VALUE")
+        indice = {}
+        for lin, v in enumerate(todos[1:], start=2):
+            indice.setdefault(_chave_id(v), []).append(lin)
+    return {_chave_id(v): indice.get(_chave_id(v), []) for v in valores}
+
+def _sheets_upsert(tabela: str, dados, key: str = "ID", tipos_colunas: dict = None,
+                   so_atualiza: bool = False) -> pd.DataFrame:
+    registros = _registros(dados)
+    if not registros:
+        return _resultado_upsert([], key, [])
+    ws = _aba(tabela)
+    diferencas = _diferencas(_frame_aba(tabela), registros, key)
+
+    alterados = [(r, mudou) for r, mudou in diferencas if mudou]
+    linhas = _linhas_por_chave(ws, tabela, key, [_valor_celula(r.get(key, "")) for r, _ in alterados])
+    header, celulas, novos, estados, atualizados = None, [], [], [], []
+    antes = _versao_antes_da_escrita() if alterados else None
+    for registro, mudou in diferencas:
+        lins = linhas.get(_chave_id(_valor_celula(registro.get(key, ""))), []) if mudou else []
+        if mudou is None or (mudou and not lins):  # chave ausente (ou apagada por fora)
+            if so_atualiza:
+                estados.append("ausente")
+                continue
+            novos.append(registro)
+            estados.append("inserido")
+        elif not mudou:
+            estados.append("inalterado")
+        else:
+            if header is None:
+                header = _garante_colunas(ws, [c for _, m in alterados for c in m])
+            posicoes = {str(h).strip().lower(): i + 1 for i, h in enumerate(header)}
+            for lin in lins:
+                for c, v in mudou.items():
+                    celulas.append({
+                        "range": rowcol_to_a1(lin, posicoes[c.strip().lower()]),
+                        "values": [[_valor_celula(v)]],
+                    })
+            estados.append("atualizado")
+            atualizados.append((registro, mudou))
+
+    if celulas:
+        ws.batch_update(celulas, value_input_option=ValueInputOption.user_entered)
+        if any(c.lower() == "id" for _, m in alterados for c in m):
+            with _indice_lock:
+                _indices.pop(tabela, None)
+        _aplica_no_cache(tabela, lambda base: _frame_com_alteracoes(base, atualizados, key, tabela), [key], antes)
+    if novos:
+        _sheets_insert(tabela, novos, tipos_colunas)  # gera o ID dos novos (mesmos dicts)
+    return _resultado_upsert(registros, key, estados)
+
 # ===================================================
 # 🟥 DELETE
 # ===================================================
-@retry_api_error
-def delete(tabela: str, where: str, tipos_colunas: dict) -> int:
-    ws = _sheet.worksheet(tabela)
-    df = pd.DataFrame(ws.get_all_records()).rename(columns=str.strip)
-    if df.empty:
+def _agrupa_intervalos(linhas: list) -> list:
+    """Junta números de linha adjacentes em intervalos contíguos (inicio, fim)"""
+    intervalos = []
+    for lin in sorted(set(linhas)):
+        if intervalos and lin == intervalos[-1][1] + 1:
+            intervalos[-1][1] = lin
+        else:
+            intervalos.append([lin, lin])
+    return [tuple(i) for i in intervalos]
+
+def _requisicoes_apagar(ws, linhas: list) -> list:
+    """deleteDimension das linhas (numeração da planilha), de baixo para cima
+    para que um intervalo não desloque o outro"""
+    return [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": ws.id,
+                    "dimension": "ROWS",
+                    "startIndex": inicio - 1,
+                    "endIndex": fim,
+                }
+            }
+        }
+        for inicio, fim in reversed(_agrupa_intervalos(linhas))
+    ]
+
+def _apaga_linhas(ws, linhas: list) -> None:
+    """Apaga as linhas (numeração da planilha) em um único batch_update"""
+    if not linhas:
+        return
+    _planilha().batch_update({"requests": _requisicoes_apagar(ws, linhas)})
+
+def _apaga_e_reindexa(ws, tabela: str, linhas: list, filtros: list) -> int:
+    if not linhas:
         return 0
-    df = _scale(df, tipos_colunas, "gravar")
-    col_map = _map_cols(df)
-    campo, _, alvo = [s.strip() for s in where.split(",")]
-    real = col_map[campo.lower()]
-    if tipos_colunas.get(real) == "numero100":
-        try:
-            alvo = str(float(alvo))
-        except Exception:
-            pass
-    linhas = df.index[df[real].astype(str) == str(alvo)]
-    for i in sorted(linhas, reverse=True):
-        ws.delete_rows(i + 2)
+    antes = _versao_antes_da_escrita()
+    _apaga_linhas(ws, linhas)
+    _indice_remove_linhas(tabela, linhas)
+    _aplica_no_cache(
+        tabela, lambda base: _frame_com_delete(base, filtros, tabela), [f.campo for f in filtros], antes,
+    )
+    return len(linhas)
+
+def _sheets_delete(tabela: str, where: str, tipos_colunas: dict) -> int:
+    ws = _aba(tabela)
+    filtros = _filtros(where)
+    linhas, _ = _linhas_onde(ws, tabela, filtros, tipos_colunas)
+    return _apaga_e_reindexa(ws, tabela, linhas, filtros)
+
+def _sheets_delete_many(tabela: str, ids: list, id_col: str = "ID") -> int:
+    """Apaga várias linhas pelo ID com um único batch_update"""
+    if not len(ids):
+        return 0
+    ws = _aba(tabela)
+    filtros = [em(id_col, ids)]
+    linhas, _ = _linhas_onde(ws, tabela, filtros, {})
+    return _apaga_e_reindexa(ws, tabela, linhas, filtros)
+
+# ===================================================
+# 🚚 MOVE (linha de uma aba para outra)
+# ===================================================
+# Protocolo que muda de cidade muda de aba: o appendCells no destino e o
+# deleteDimension na origem vão no mesmo batch_update, que a API aplica por
+# inteiro ou não aplica (nunca fica duplicado nem some).
+def _celula_api(v) -> dict:
+    """Valor -> CellData do appendCells (gravado como veio, igual ao append RAW)"""
+    v = _valor_celula(v)
+    if isinstance(v, str):
+        return {"userEnteredValue": {"stringValue": v}} if v != "" else {}
+    if isinstance(v, bool):
+        return {"userEnteredValue": {"boolValue": v}}
+    if isinstance(v, (int, float)):
+        return {"userEnteredValue": {"numberValue": v}}
+    return {"userEnteredValue": {"stringValue": str(v)}}
+
+def _datas_em_texto(registros: list, esquema: Esquema) -> list:
+    """Datas lidas como serial voltam ao texto dd/mm/aaaa que as páginas gravam"""
+    for registro in registros:
+        for coluna, v in registro.items():
+            if esquema.get(coluna) == "data" and isinstance(v, (int, float)) and not isinstance(v, bool):
+                registro[coluna] = (_ORIGEM_SERIAL + pd.Timedelta(days=v)).strftime(FORMATO_DATA)
+    return registros
+
+def _sheets_move(id_linha, de: str, para: str, alteracoes: dict = None,
+                 id_col: str = "ID", tipos_colunas: dict = None) -> int:
+    alteracoes = dict(alteracoes or {})
+    filtros = [eq(id_col, id_linha)]
+    if de == para:
+        if not alteracoes:
+            return 0
+        return _sheets_update(de, list(alteracoes), list(alteracoes.values()), filtros, tipos_colunas or {})
+
+    ws_de, ws_para = _aba(de), _aba(para)
+    linhas, _ = _linhas_onde(ws_de, de, filtros, tipos_colunas or {})
+    if not linhas:
+        return 0
+    header = [str(h).strip() for h in _cabecalho(ws_de)]
+    nomes = {h.lower(): h for h in header}
+    alteracoes = {nomes.get(c.strip().lower(), c.strip()): v for c, v in alteracoes.items()}
+    ultima = rowcol_to_a1(1, len(header))[:-1]
+    blocos = ws_de.batch_get(
+        [f"A{lin}:{ultima}{lin}" for lin in linhas], value_render_option="UNFORMATTED_VALUE"
+    )
+    registros = []
+    for bloco in blocos:
+        valores = list(bloco[0]) if bloco else []
+        valores += [""] * (len(header) - len(valores))
+        registros.append({**dict(zip(header, valores)), **alteracoes})
+    registros = _datas_em_texto(registros, esquema_de(tipos_colunas, para))
+
+    antes = _versao_antes_da_escrita()
+    header_para = _garante_colunas(ws_para, [c for r in registros for c in r])
+    linhas_para = [
+        [_celula_api({c.lower(): v for c, v in r.items()}.get(str(h).strip().lower(), "")) for h in header_para]
+        for r in registros
+    ]
+    _planilha().batch_update({"requests": [
+        {"appendCells": {
+            "sheetId": ws_para.id,
+            "rows": [{"values": linha} for linha in linhas_para],
+            "fields": "userEnteredValue",
+        }},
+        *_requisicoes_apagar(ws_de, linhas),
+    ]})
+
+    with _indice_lock:
+        _indices.pop(para, None)  # appendCells não devolve a linha; o índice sai do cache
+    _indice_remove_linhas(de, linhas)
+    _aplica_no_cache(para, lambda base: _frame_com_insert(base, registros, ignora_existentes=False),
+                     antes=antes)
+    _aplica_no_cache(de, lambda base: _frame_com_delete(base, filtros, de), [id_col], antes)
     return len(linhas)
+
+# ===================================================
+# 🩹 ESCRITAS SOBRE O FRAME EM MEMÓRIA
+# ===================================================
+# As mesmas operações, feitas num DataFrame cru (como veio da planilha).
+# As escritas diretas usam para atualizar o cache (leia o que escreveu); a
+# escrita adiada, para mostrar na hora o que ainda está na fila (reaplicar uma
+# escrita que já chegou à planilha não muda o resultado).
+def _mascara_crua(df: pd.DataFrame, filtros: list, tabela: str) -> pd.Series:
+    nomes = _map_cols(df)
+    if df.empty or any(f.campo.lower() not in nomes for f in filtros):
+        return pd.Series(False, index=df.index)
+    return _mascara(esquema_de(None, tabela).converte(df), filtros)
+
+def _frame_com_insert(df: pd.DataFrame, registros: list, ignora_existentes: bool = True) -> pd.DataFrame:
+    """Anexa os registros (por padrão, só os que têm ID ainda fora do frame)"""
+    novos = pd.DataFrame([{c: _valor_celula(v) for c, v in r.items()} for r in registros])
+    if novos.empty:
+        return df
+    if ignora_existentes and "ID" in df.columns and "ID" in novos.columns:
+        novos = novos[~novos["ID"].map(_chave_id).isin(set(df["ID"].map(_chave_id)))]
+        if novos.empty:
+            return df
+    colunas = list(df.columns) + [c for c in novos.columns if c not in df.columns]
+    return pd.concat(
+        [df.reindex(columns=colunas, fill_value=""), novos.reindex(columns=colunas, fill_value="")],
+        ignore_index=True,
+    )
+
+def _frame_com_update(df: pd.DataFrame, campos: list, valores: list, filtros: list, tabela: str) -> pd.DataFrame:
+    mascara = _mascara_crua(df, filtros, tabela)
+    if not mascara.any():
+        return df
+    df = df.copy()
+    nomes = _map_cols(df)
+    for c, v in zip(campos, valores):
+        coluna = nomes.get(c.strip().lower(), c.strip())
+        if coluna not in df.columns:
+            df[coluna] = ""
+        df[coluna] = df[coluna].astype(object)
+        df.loc[mascara, coluna] = _valor_celula(v)
+    return df
+
+def _frame_com_delete(df: pd.DataFrame, filtros: list, tabela: str) -> pd.DataFrame:
+    mascara = _mascara_crua(df, filtros, tabela)
+    return df[~mascara].reset_index(drop=True) if mascara.any() else df
+
+def _frame_com_alteracoes(df: pd.DataFrame, alteracoes: list, key: str, tabela: str) -> pd.DataFrame:
+    """alteracoes = [(registro, {coluna: novo valor})], linha achada pela `key`"""
+    for registro, mudou in alteracoes:
+        df = _frame_com_update(df, list(mudou), list(mudou.values()), [eq(key, registro.get(key))], tabela)
+    return df
+
+def _frame_com_upsert(df: pd.DataFrame, registros: list, key: str, tabela: str,
+                      so_atualiza: bool = False) -> pd.DataFrame:
+    diferencas = _diferencas(df, registros, key)
+    df = _frame_com_alteracoes(df, [(r, m) for r, m in diferencas if m], key, tabela)
+    if so_atualiza:
+        return df
+    return _frame_com_insert(df, [r for r, m in diferencas if m is None])
+
+def _aplica_escrita(df: pd.DataFrame, escrita: dict, tabela: str) -> pd.DataFrame:
+    """escrita = {"operacao": insert | update | delete | upsert | move, ...argumentos}"""
+    operacao = escrita["operacao"]
+    if operacao == "insert":
+        return _frame_com_insert(df, escrita["registros"])
+    if operacao == "update":
+        return _frame_com_update(df, escrita["campos"], escrita["valores"], escrita["where"], tabela)
+    if operacao == "delete":
+        return _frame_com_delete(df, escrita["where"], tabela)
+    if operacao == "upsert":
+        return _frame_com_upsert(df, escrita["registros"], escrita["key"], tabela,
+                                 escrita.get("so_atualiza", False))
+    if operacao == "move":  # a mesma escrita vale para a aba de origem e a de destino
+        if tabela == escrita["para"]:
+            return _frame_com_insert(df, escrita["registros"])
+        return _frame_com_delete(df, [eq(escrita["id_col"], escrita["id"])], tabela)
+    raise ValueError(f"Operação desconhecida: {operacao!r}")
+
+def _sobrepoe_pendentes(frames: dict, colunas: list = None) -> dict:
+    """Leituras + escritas que ainda estão na fila do backend (escrita adiada).
+    Aba projetada com escrita pendente sai do frame inteiro e é recortada depois."""
+    atual = _backend_atual
+    if atual is None:
+        return frames
+    saida = dict(frames)
+    for nome, df in frames.items():
+        if df is None or not atual.pendentes(nome):
+            continue
+        if colunas is not None:
+            df = _frame_aba(nome)
+        df = atual.sobrepoe(nome, df)
+        saida[nome] = df if colunas is None else _recorta(df, tuple(colunas))
+    return saida
+# ===================================================
+# 🔌 BACKEND DE ARMAZENAMENTO (sheets | sqlite | replica)
+# ===================================================
+# As páginas continuam importando select/insert/update/delete daqui;
+# essas funções só repassam para o backend escolhido em [conversa_banco] backend.
+class Backend:
+    """Interface de armazenamento: mesmas assinaturas das funções públicas do módulo"""
+
+    def select_aba(self, tabela: str, tipos_colunas: dict, colunas: list = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def select_protocolos(self, tipos_colunas: dict, colunas: list = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def insert(self, tabela: str, dados, tipos_colunas: dict = None) -> None:
+        raise NotImplementedError
+
+    def update(self, tabela: str, campos: list, valores: list, where, tipos_colunas: dict) -> int:
+        raise NotImplementedError
+
+    def delete(self, tabela: str, where, tipos_colunas: dict) -> int:
+        raise NotImplementedError
+
+    def delete_many(self, tabela: str, ids: list, id_col: str = "ID") -> int:
+        raise NotImplementedError
+
+    def upsert(self, tabela: str, dados, key: str = "ID", tipos_colunas: dict = None,
+               so_atualiza: bool = False) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def move(self, id_linha, de: str, para: str, alteracoes: dict = None,
+             id_col: str = "ID", tipos_colunas: dict = None) -> int:
+        raise NotImplementedError
+
+    # ─── Escrita adiada (só quem tem fila sobrescreve) ───────────
+    def pendentes(self, tabela: str) -> bool:
+        """Há escritas nesta aba que ainda não chegaram à planilha?"""
+        return False
+
+    def sobrepoe(self, tabela: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Frame cru lido + escritas pendentes da aba"""
+        return df
+
+    def situacao(self) -> dict:
+        return {"pendentes": 0, "falhas": 0, "erro": ""}
+
+class _BackendSheets(Backend):
+    """Google Sheets via gspread (implementação deste módulo)"""
+
+    def select_aba(self, tabela, tipos_colunas, colunas=None):
+        return _sheets_select_aba(tabela, tipos_colunas, colunas)
+
+    def select_protocolos(self, tipos_colunas, colunas=None):
+        return _sheets_select_protocolos(tipos_colunas, colunas)
+
+    def insert(self, tabela, dados, tipos_colunas=None):
+        return _sheets_insert(tabela, dados, tipos_colunas)
+
+    def update(self, tabela, campos, valores, where, tipos_colunas):
+        return _sheets_update(tabela, campos, valores, where, tipos_colunas)
+
+    def delete(self, tabela, where, tipos_colunas):
+        return _sheets_delete(tabela, where, tipos_colunas)
+
+    def delete_many(self, tabela, ids, id_col="ID"):
+        return _sheets_delete_many(tabela, ids, id_col)
+
+    def upsert(self, tabela, dados, key="ID", tipos_colunas=None, so_atualiza=False):
+        return _sheets_upsert(tabela, dados, key, tipos_colunas, so_atualiza)
+
+    def move(self, id_linha, de, para, alteracoes=None, id_col="ID", tipos_colunas=None):
+        return _sheets_move(id_linha, de, para, alteracoes, id_col, tipos_colunas)
+
+BACKEND = _config("backend", "sheets")
+# Escrita adiada: insert/update/delete vão para uma fila local (SQLite) e uma
+# thread grava na planilha; a tela já mostra a escrita (ver fila_escrita.py)
+ESCRITA_ADIADA = bool(_config("escrita_adiada", False))
+_backend_atual = None
+
+def backend() -> Backend:
+    """Backend configurado, criado no primeiro uso"""
+    global _backend_atual
+    if _backend_atual is None:
+        with _conexao_lock:
+            if _backend_atual is None:
+                if BACKEND == "sheets":
+                    _backend_atual = _BackendSheets()
+                elif BACKEND == "sqlite":
+                    from funcoes_compartilhadas.banco_sqlite import BackendSQLite
+                    _backend_atual = BackendSQLite(_config("sqlite_arquivo", "dados/banco.sqlite3"))
+                elif BACKEND == "replica":
+                    from funcoes_compartilhadas.banco_sqlite import BackendReplica
+                    _backend_atual = BackendReplica(
+                        _config("sqlite_arquivo", "dados/banco.sqlite3"),
+                        intervalo=float(_config("replica_intervalo", 60)),
+                    )
+                else:
+                    raise ValueError(f"Backend desconhecido em [conversa_banco]: {BACKEND!r}")
+                if ESCRITA_ADIADA and BACKEND == "sheets":
+                    from funcoes_compartilhadas.fila_escrita import BackendFila
+                    _backend_atual = BackendFila(
+                        _backend_atual,
+                        _config("fila_arquivo", "dados/fila_escrita.sqlite3"),
+                        intervalo=float(_config("fila_intervalo", 2)),
+                    )
+                elif ESCRITA_ADIADA:
+                    print(f"[conversa_banco] escrita_adiada só vale para o backend sheets (atual: {BACKEND!r})")
+    return _backend_atual
+
+def usar_backend(novo: Backend) -> None:
+    """Troca o backend em tempo de execução (scripts, migrações)"""
+    global _backend_atual
+    with _conexao_lock:
+        _backend_atual = novo
+
+def select_aba(tabela: str, tipos_colunas: dict = None, colunas: list = None,
+               where=None, order_by=None, limit: int = None) -> pd.DataFrame:
+    """Lê uma única aba/tabela.
+    colunas: só essas colunas | where: Filtro(s) (eq, em, entre, contem)
+    order_by: "Campo" ou "-Campo" (decrescente), ou lista | limit: máximo de linhas"""
+    filtros, ordem = _filtros(where), _ordem(order_by)
+    leitura, extras = _colunas_da_consulta(colunas, filtros, ordem)
+    df = backend().select_aba(tabela, esquema_de(tipos_colunas, tabela), leitura)
+    return _consulta(df, filtros, ordem, limit, extras)
+
+def select_protocolos(tipos_colunas: dict = None, colunas: list = None,
+                      where=None, order_by=None, limit: int = None) -> pd.DataFrame:
+    """Lê somente abas de cidades (protocolos) e concatena em um único DataFrame"""
+    filtros, ordem = _filtros(where), _ordem(order_by)
+    leitura, extras = _colunas_da_consulta(colunas, filtros, ordem)
+    df = backend().select_protocolos(esquema_de(tipos_colunas, ABAS_PROTOCOLOS[0]), leitura)
+    return _consulta(df, filtros, ordem, limit, [c for c in extras if c != "Cidade"])
+
+def insert(tabela: str, dados, tipos_colunas: dict = None) -> None:
+    """Insere um dict, lista de dicts ou DataFrame (gera ID onde faltar).
+    `tipos_colunas` define os tipos das colunas quando o backend cria a tabela."""
+    return backend().insert(tabela, dados, tipos_colunas)
+
+def update(tabela: str, campos: list, valores: list, where, tipos_colunas: dict = None) -> int:
+    """Atualiza as linhas do `where` (Filtro, lista de Filtro ou "campo,op,valor")"""
+    return backend().update(tabela, campos, valores, where, tipos_colunas or {})
+
+def delete(tabela: str, where, tipos_colunas: dict = None) -> int:
+    """Apaga as linhas do `where` (Filtro, lista de Filtro ou "campo,op,valor")"""
+    return backend().delete(tabela, where, tipos_colunas or {})
+
+def delete_many(tabela: str, ids: list, id_col: str = "ID") -> int:
+    """Apaga várias linhas pelo ID de uma vez"""
+    return backend().delete_many(tabela, ids, id_col)
+
+def upsert(tabela: str, dados, key: str = "ID", tipos_colunas: dict = None,
+           so_atualiza: bool = False) -> pd.DataFrame:
+    """Grava um lote (DataFrame / lista de dicts) pela coluna `key`: atualiza só as
+    células que mudaram e anexa as chaves novas (gerando ID onde faltar).
+    Com `so_atualiza`, chaves que não existem (ex.: linha apagada enquanto a tela
+    estava aberta) não são anexadas e voltam como "ausente".
+    Devolve um DataFrame [key, resultado] com "atualizado", "inserido", "inalterado"
+    ou "ausente"."""
+    return backend().upsert(tabela, dados, key, tipos_colunas, so_atualiza)
+
+def move(id_linha, de: str, para: str, alteracoes: dict = None,
+         id_col: str = "ID", tipos_colunas: dict = None) -> int:
+    """Leva a linha `id_linha` da aba `de` para a aba `para` (protocolo que mudou
+    de cidade), já com as `alteracoes`. Na planilha, inclusão e exclusão vão
+    numa única requisição. Devolve quantas linhas mudaram de aba."""
+    return backend().move(id_linha, de, para, alteracoes, id_col, tipos_colunas)
+
+def escritas_pendentes() -> dict:
+    """{"pendentes", "falhas", "erro"} da escrita adiada (zeros quando desligada)"""
+    return backend().situacao()
+
 # ===================================================
 # 🔁 COMPATIBILIDADE COM CÓDIGO ANTIGO (LOGIN, USUÁRIOS, ETC)
 # ===================================================
 
-@retry_api_error
-def select(tabela: str, tipos_colunas: dict) -> pd.DataFrame:
+def select(tabela: str, tipos_colunas: dict = None, colunas: list = None,
+           where=None, order_by=None, limit: int = None) -> pd.DataFrame:
     """
     Função genérica para leitura de abas únicas:
     usada por login, usuários, eventos, permissões, etc.
     """
-    return select_aba(tabela, tipos_colunas)
+    return select_aba(tabela, tipos_colunas, colunas, where, order_by, limit)
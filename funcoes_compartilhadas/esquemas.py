@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Esquemas das tabelas (um lugar só para colunas e tipos):
+• Tipos: id, texto, data, numero, numero100
+• Domínios das colunas categóricas (Andamento, Tipo de Serviço, Cidade, Militar)
+• Datas: serial do Sheets ou dd/mm/aaaa viram datetime64 uma vez por leitura;
+  o texto dd/mm/aaaa só aparece na exibição (texto_data / para_exibicao)
+Cada esquema compila um conversor vetorizado (uma passada por coluna),
+aplicado pelo conversa_banco uma vez por leitura.
+"""
+
+from collections.abc import Mapping
+import pandas as pd
+
+# ===================================================
+# 📚 DOMÍNIOS
+# ===================================================
+CIDADES = [
+    "Porangatu", "Santa Tereza", "Estrela do Norte", "Formoso",
+    "Trombas", "Novo Planalto", "Montividiu", "Mutunópolis",
+]
+
+ANDAMENTOS = [
+    "Protocolado",
+    "Vistoria Feita",
+    "Cercon Impresso",
+    "Empresa Encerrou",
+    "Empresa/Proprietário Não Localizado",
+    "Não Certificou",
+]
+
+TIPOS_SERVICO = [
+    "Vistoria para Funcionamento",
+    "Licenciamento Facilitado",
+    "Análise de Projeto",
+    "Substituição de Projeto",
+    "Ponto de Referência",
+    "Credenciamento Extintor/Brigada",
+    "Denúncia",
+]
+
+MILITARES = ["2° Ten D'Lauan", "2° Sgt Tamilla", "2° Sgt Ribeiro", "2° Sgt Éderson", "Sd Amanda"]
+
+# Coluna -> domínio: vira category (valores fora do domínio entram como categorias extras)
+DOMINIOS = {
+    "Andamento": ANDAMENTOS,
+    "Tipo de Serviço": TIPOS_SERVICO,
+    "Cidade": CIDADES,
+    "Militar Responsável": MILITARES,
+}
+
+FORMATO_DATA = "%d/%m/%Y"
+
+# ===================================================
+# 🔧 CONVERSORES VETORIZADOS (uma coluna por vez)
+# ===================================================
+_ORIGEM_SERIAL = pd.Timestamp("1899-12-30")  # dia 0 das datas do Sheets
+_MAIOR_SERIAL = 2958465                       # 31/12/9999
+
+def para_datas(serie: pd.Series) -> pd.Series:
+    """Serial do Sheets ou texto dd/mm/aaaa (ou outro formato com dia primeiro) -> datetime64"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    numeros = pd.to_numeric(serie, errors="coerce")
+    numeros = numeros.where((numeros > 0) & (numeros < _MAIOR_SERIAL))
+    datas = pd.to_datetime(numeros, unit="D", origin=_ORIGEM_SERIAL)
+    resto = serie[numeros.isna() & serie.notna()]  # o texto vem só das células que não são serial
+    if resto.empty:
+        return datas
+    resto = resto.astype(str).str.strip()
+    resto = resto[~resto.isin(["", "nan", "None"])]
+    datas = datas.fillna(pd.to_datetime(resto, format=FORMATO_DATA, errors="coerce"))
+    faltando = resto.index[datas[resto.index].isna()]
+    if len(faltando):  # com hora, ISO etc.: só as células que sobraram
+        datas[faltando] = pd.to_datetime(resto[faltando], dayfirst=True, errors="coerce", format="mixed")
+    return datas
+
+def texto_data(valor) -> str:
+    """Data (Timestamp, date ou o texto digitado) -> dd/mm/aaaa para exibir; vazio vira "" """
+    if valor is None or valor is pd.NaT or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    if hasattr(valor, "strftime"):
+        return valor.strftime(FORMATO_DATA)
+    return str(valor)
+
+def para_exibicao(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia com as colunas datetime64 em texto dd/mm/aaaa (vazio para NaT)"""
+    datas = {c: df[c].dt.strftime(FORMATO_DATA).fillna("")
+             for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])}
+    return df.assign(**datas) if datas else df.copy()
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """Texto limpo; 12.0 vira "12" e vazio/NaN vira "" """
+    texto = serie.astype(str).str.strip()
+    inteiro = texto.str.endswith(".0", na=False)
+    if inteiro.any():  # só testa como número quem termina em ".0"
+        inteiro &= pd.to_numeric(serie.where(inteiro), errors="coerce").mod(1).eq(0)
+        texto = texto.mask(inteiro, texto.str[:-2])
+    return texto.mask(serie.isna(), "")
+
+def _numero(serie: pd.Series) -> pd.Series:
+    """Número (vírgula decimal aceita); vazio vira NaN. Texto que não é
+    número deixa a coluna como veio, para não perder o que foi digitado."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    texto = _texto(serie).str.replace(",", ".", regex=False)
+    vazio = texto == ""
+    numeros = pd.to_numeric(texto.mask(vazio), errors="coerce")
+    if (numeros.isna() & ~vazio).any():
+        return serie
+    return numeros
+
+def _data(formato):
+    def converte(serie: pd.Series) -> pd.Series:
+        datas = para_datas(serie)
+        if formato is None:
+            return datas
+        texto = datas.dt.strftime(formato)
+        vazias = datas.isna()
+        if vazias.any():  # o que não é data fica como foi digitado
+            texto = texto.mask(vazias, _texto(serie[vazias]))
+        return texto
+    return converte
+
+def _categoria(dominio: list):
+    def converte(serie: pd.Series) -> pd.Series:
+        texto = _texto(serie)
+        extras = sorted(set(texto.unique()) - set(dominio))
+        return texto.astype(pd.CategoricalDtype(list(dominio) + extras))
+    return converte
+
+# ===================================================
+# 🧩 ESQUEMA
+# ===================================================
+class Esquema(Mapping):
+    """Colunas e tipos de uma tabela. Funciona como o antigo dict TIPOS
+    ({coluna: tipo}) e converte o DataFrame cru numa única passada.
+    Datas saem em datetime64; com formato_data (ex.: FORMATO_DATA) saem como texto."""
+
+    def __init__(self, colunas: dict, dominios: dict = None,
+                 formato_data: str = None, nome: str = ""):
+        self.nome = nome
+        self.tipos = dict(colunas)
+        self.dominios = {c: d for c, d in {**DOMINIOS, **(dominios or {})}.items() if c in self.tipos}
+        self.formato_data = formato_data
+        self._conversores = self._compila()
+
+    def _compila(self) -> dict:
+        conversores = {}
+        for coluna, tipo in self.tipos.items():
+            if coluna in self.dominios:
+                conversores[coluna] = _categoria(self.dominios[coluna])
+            elif tipo == "data":
+                conversores[coluna] = _data(self.formato_data)
+            elif tipo in ("numero", "numero100"):
+                conversores[coluna] = _numero
+            else:  # id, texto
+                conversores[coluna] = _texto
+        return conversores
+
+    def converte(self, df: pd.DataFrame) -> pd.DataFrame:
+        """DataFrame cru (como veio da planilha) -> tipado; só as colunas presentes"""
+        novas = {c: f(df[c]) for c, f in self._conversores.items() if c in df.columns}
+        if not novas:
+            return df.copy()
+        tipado = df.assign(**novas)
+        tipado.attrs = dict(df.attrs)
+        return tipado
+
+    # ─── Interface de dict (compatível com tipos_colunas) ────────
+    def __getitem__(self, coluna):
+        return self.tipos[coluna]
+
+    def __iter__(self):
+        return iter(self.tipos)
+
+    def __len__(self):
+        return len(self.tipos)
+
+    # Mesmo esquema = mesmo objeto (serve de chave do cache de conversões)
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return f"Esquema({self.nome or self.tipos!r})"
+
+# ===================================================
+# 🗂️ REGISTRO
+# ===================================================
+PROTOCOLOS = Esquema({
+    "ID": "id",
+    "Data de Protocolo": "data",
+    "Nº de Protocolo": "texto",
+    "Tipo de Serviço": "texto",
+    "CPF/CNPJ": "texto",
+    "Nome Fantasia": "texto",
+    "Área (m²)": "numero",
+    "Notificação": "texto",
+    "Validade do Boleto": "data",
+    "Validade do Cercon": "data",
+    "Tipo de Empresa": "texto",
+    "Contato": "texto",
+    "Militar Responsável": "texto",
+    "Andamento": "texto",
+    "Cidade": "texto",
+}, nome="protocolos")
+
+USUARIOS = Esquema({
+    "ID": "id",
+    "Nome": "texto",
+    "Email": "texto",
+    "Senha": "texto",
+}, nome="usuarios")
+
+PERMISSOES = Esquema({
+    "ID": "id",
+    "ID_Usuario": "texto",
+    "ID_Funcionalidade": "texto",
+}, nome="permissoes")
+
+MENUS = Esquema({
+    "ID": "id",
+    "Nome": "texto",
+    "Ordem": "numero100",
+}, nome="menus")
+
+FUNCIONALIDADES = Esquema({
+    "ID": "id",
+    "ID_Menu": "texto",
+    "Nome": "texto",
+    "Caminho": "texto",
+}, nome="funcionalidades")
+
+EVENTOS = Esquema({
+    "ID": "id",
+    "Data": "data",
+    "Título": "texto",
+    "Descrição": "texto",
+}, nome="eventos")
+
+PAINEL_FINANCEIRO = Esquema({
+    "Data": "data",
+    "Valor": "numero",
+    "Status": "texto",
+    "Observação": "texto",
+}, nome="painel_financeiro")
+
+ESQUEMAS = {
+    **{cidade: PROTOCOLOS for cidade in CIDADES},
+    "usuarios": USUARIOS,
+    "permissoes": PERMISSOES,
+    "menus": MENUS,
+    "funcionalidades": FUNCIONALIDADES,
+    "eventos": EVENTOS,
+    "painel_financeiro": PAINEL_FINANCEIRO,
+}
+
+_SEM_TIPOS = Esquema({}, nome="sem tipos")
+_compilados: dict = {}  # dict de tipos (páginas antigas) -> Esquema compilado
+
+def esquema_de(tipos=None, tabela: str = None) -> Esquema:
+    """Esquema para uma leitura: o próprio, um dict de tipos (compilado uma vez)
+    ou, sem tipos, o registrado para a tabela"""
+    if isinstance(tipos, Esquema):
+        return tipos
+    if not tipos:
+        return ESQUEMAS.get(tabela, _SEM_TIPOS)
+    chave = tuple(tipos.items())
+    if chave not in _compilados:
+        _compilados[chave] = Esquema(tipos)
+    return _compilados[chave]
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Escrita adiada do conversa_banco (escrita_adiada = true no [conversa_banco]):
+• insert/update/delete/upsert/move voltam na hora: a escrita entra num diário
+  SQLite (sobrevive a reinícios) e já aparece nas leituras deste processo
+• Uma thread grava o diário na planilha, aba por aba e na ordem em que chegou,
+  juntando inserts seguidos numa requisição; falhas esperam e tentam de novo
+• escritas_pendentes() alimenta o indicador da barra lateral
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import pandas as pd
+from funcoes_compartilhadas.conversa_banco import (
+    Backend, Filtro, CACHE_TTL, BACKOFF_BASE, BACKOFF_MAX, em, eq, _filtros, _frame_aba,
+    _registros, _registros_com_id, _valor_celula, _diferencas, _resultado_upsert,
+    _mascara_crua, _aplica_escrita,
+)
+
+TENTATIVAS_FILA = 8          # depois disso a escrita fica marcada como falha no diário
+RETENCAO = 2 * CACHE_TTL     # segundos que uma escrita já gravada continua sobreposta
+MAX_LOTE_INSERT = 500        # linhas por append quando inserts seguidos são juntados
+
+# ─── Escrita <-> JSON (o diário guarda texto) ────────────────────
+def _valor_json(v):
+    if isinstance(v, pd.Timestamp):
+        return v.isoformat()
+    convertido = _valor_celula(v)
+    return convertido if convertido is not v else str(v)
+
+def _para_json(escrita: dict) -> str:
+    escrita = dict(escrita)
+    if "where" in escrita:
+        escrita["where"] = [{"campo": f.campo, "op": f.op, "valores": f.valores} for f in escrita["where"]]
+    return json.dumps(escrita, default=_valor_json, ensure_ascii=False)
+
+def _de_json(texto: str) -> dict:
+    escrita = json.loads(texto)
+    if "where" in escrita:
+        escrita["where"] = [
+            Filtro(f["campo"], f["op"], [
+                pd.Timestamp(v) if f["op"] == "entre" and isinstance(v, str) else v
+                for v in f["valores"]
+            ])
+            for f in escrita["where"]
+        ]
+    return escrita
+
+def _limpos(registros: list) -> list:
+    """Cópias só com valores aceitos pela API (o diário e a planilha recebem as mesmas)"""
+    return [{c: _valor_celula(v) for c, v in r.items()} for r in registros]
+
+class BackendFila(Backend):
+    """Envolve o backend Sheets: leituras passam direto (com as escritas
+    pendentes sobrepostas), escritas vão para o diário e para a thread"""
+
+    def __init__(self, origem: Backend, arquivo: str, intervalo: float = 2):
+        pasta = os.path.dirname(arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.origem = origem
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self._con = sqlite3.connect(arquivo, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        with self._con:
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS fila ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " aba TEXT NOT NULL,"
+                " escrita TEXT NOT NULL,"
+                " tentativas INTEGER NOT NULL DEFAULT 0,"
+                " erro TEXT NOT NULL DEFAULT '',"
+                " falhou INTEGER NOT NULL DEFAULT 0,"
+                " criada REAL NOT NULL)"
+            )
+        self._lock = threading.RLock()
+        self._descarga = threading.Lock()
+        self._pendentes: dict = {}   # aba -> [[seq, escrita, tentativas]] na ordem de chegada
+        self._recentes: dict = {}    # aba -> [(momento, seq, escrita)] já gravadas, ainda sobrepostas
+        self._espera: dict = {}      # aba -> momento da próxima tentativa
+        self._sobrepostos: dict = {} # aba -> (frame cru, versão, frame com as escritas)
+        self._versao = 0             # muda a cada escrita enfileirada ou gravada
+        self._falhas = 0
+        self._erro = ""              # último erro; some quando uma gravação dá certo
+        self._erro_falha = ""        # erro da última escrita abandonada (falhou = 1)
+
+        # ✅ O que ficou no diário de uma execução anterior volta para a fila
+        for seq, aba, texto, tentativas, erro, falhou in self._con.execute(
+            "SELECT seq, aba, escrita, tentativas, erro, falhou FROM fila ORDER BY seq"
+        ).fetchall():
+            if falhou:
+                self._falhas += 1
+                self._erro = self._erro_falha = erro
+            else:
+                self._pendentes.setdefault(aba, []).append([seq, _de_json(texto), tentativas])
+
+        self._acorda = threading.Event()
+        if self._pendentes:
+            self._acorda.set()
+        threading.Thread(target=self._laco, name="fila-escrita", daemon=True).start()
+
+    # ─── Diário ──────────────────────────────────────────────────
+    def _enfileira(self, tabela: str, escrita: dict) -> None:
+        with self._lock:
+            with self._con:
+                seq = self._con.execute(
+                    "INSERT INTO fila (aba, escrita, criada) VALUES (?, ?, ?)",
+                    (tabela, _para_json(escrita), time.time()),
+                ).lastrowid
+            self._pendentes.setdefault(tabela, []).append([seq, escrita, 0])
+            self._versao += 1
+        self._acorda.set()
+
+    def _escritas_da_aba(self, tabela: str) -> list:
+        """Recentes (já gravadas) + pendentes, na ordem; chamar com o lock.
+        Um move fica na fila da aba de origem e vale também para a de destino."""
+        limite = time.monotonic() - RETENCAO
+        escritas = []
+        for aba in set(self._recentes) | set(self._pendentes):
+            recentes = self._recentes.get(aba, [])
+            vivas = [item for item in recentes if item[0] >= limite]
+            if len(vivas) != len(recentes):
+                self._recentes[aba] = vivas
+                self._versao += 1
+            itens = [(seq, e) for _, seq, e in vivas] + [(seq, e) for seq, e, _ in self._pendentes.get(aba, [])]
+            escritas += [
+                (seq, e) for seq, e in itens
+                if aba == tabela or (e["operacao"] == "move" and e["para"] == tabela)
+            ]
+        return [e for _, e in sorted(escritas, key=lambda item: item[0])]
+
+    # ─── Sobreposição nas leituras ───────────────────────────────
+    def pendentes(self, tabela):
+        with self._lock:
+            return bool(self._escritas_da_aba(tabela))
+
+    def sobrepoe(self, tabela, df):
+        with self._lock:
+            escritas = self._escritas_da_aba(tabela)
+            versao = self._versao
+            memo = self._sobrepostos.get(tabela)
+        if not escritas:
+            return df
+        if memo is not None and memo[0] is df and memo[1] == versao:
+            return memo[2]
+        resultado = df
+        for escrita in escritas:
+            resultado = _aplica_escrita(resultado, escrita, tabela)
+        if resultado is df:
+            resultado = df.copy()
+        resultado.attrs = dict(df.attrs)
+        with self._lock:
+            self._sobrepostos[tabela] = (df, versao, resultado)
+        return resultado
+
+    def _atual(self, tabela: str) -> pd.DataFrame:
+        return self.sobrepoe(tabela, _frame_aba(tabela))
+
+    def situacao(self):
+        with self._lock:
+            return {
+                "pendentes": sum(len(f) for f in self._pendentes.values()),
+                "falhas": self._falhas,
+                "erro": self._erro,
+            }
+
+    # ─── Gravação na planilha (thread) ───────────────────────────
+    def _laco(self) -> None:
+        while True:
+            self._acorda.wait(self.intervalo)
+            self._acorda.clear()
+            try:
+                self.descarrega()
+            except Exception as e:
+                print(f"[conversa_banco] fila de escrita falhou: {e}")
+
+    def descarrega(self) -> None:
+        """Grava o que está na fila (abas em espera por falha ficam para depois).
+        Repete enquanto alguma aba andar: um move gravado libera a aba de destino."""
+        with self._descarga:
+            while True:
+                with self._lock:
+                    abas = [a for a, f in self._pendentes.items()
+                            if f and time.monotonic() >= self._espera.get(a, 0)]
+                if not any([self._descarrega_aba(aba) for aba in abas]):
+                    return
+
+    def _move_anterior(self, tabela: str, seq: int) -> bool:
+        """Há um move para esta aba, mais antigo que seq, ainda na fila de outra aba?
+        Chamar com o lock."""
+        return any(
+            e["operacao"] == "move" and e["para"] == tabela and s < seq
+            for aba, fila in self._pendentes.items() if aba != tabela
+            for s, e, _ in fila
+        )
+
+    def _proximo_lote(self, tabela: str) -> list:
+        """A primeira escrita da aba; inserts seguidos vão juntos. A aba espera
+        os moves mais antigos que chegam nela (senão um update poderia ir antes
+        da linha existir no destino)."""
+        with self._lock:
+            fila = self._pendentes.get(tabela) or []
+            if fila and self._move_anterior(tabela, fila[0][0]):
+                return []
+            lote = fila[:1]
+            if lote and lote[0][1]["operacao"] == "insert":
+                linhas = len(lote[0][1]["registros"])
+                for item in fila[1:]:
+                    linhas += len(item[1]["registros"]) if item[1]["operacao"] == "insert" else 0
+                    if (item[1]["operacao"] != "insert" or linhas > MAX_LOTE_INSERT
+                            or self._move_anterior(tabela, item[0])):
+                        break
+                    lote.append(item)
+            return list(lote)
+
+    def _descarrega_aba(self, tabela: str) -> bool:
+        """Grava a fila da aba até esvaziar, travar ou falhar; diz se gravou algo"""
+        gravou = False
+        while True:
+            lote = self._proximo_lote(tabela)
+            if not lote:
+                return gravou
+            escrita = lote[0][1]
+            if len(lote) > 1:
+                escrita = {"operacao": "insert", "registros": [r for _, e, _ in lote for r in e["registros"]]}
+            try:
+                self._grava(tabela, escrita)
+            except Exception as e:
+                self._falhou(tabela, lote, e)
+                return gravou
+            self._gravou(tabela, lote)
+            gravou = True
+
+    def _grava(self, tabela: str, escrita: dict) -> None:
+        operacao = escrita["operacao"]
+        if operacao == "insert":
+            self.origem.insert(tabela, escrita["registros"])
+        elif operacao == "update":
+            self.origem.update(tabela, escrita["campos"], escrita["valores"], escrita["where"], {})
+        elif operacao == "delete":
+            self.origem.delete(tabela, escrita["where"], {})
+        elif operacao == "upsert":
+            self.origem.upsert(tabela, escrita["registros"], escrita["key"],
+                               so_atualiza=escrita.get("so_atualiza", False))
+        elif operacao == "move":
+            self.origem.move(escrita["id"], tabela, escrita["para"], escrita["alteracoes"], escrita["id_col"])
+        else:
+            raise ValueError(f"Operação desconhecida: {operacao!r}")
+
+    def _gravou(self, tabela: str, lote: list) -> None:
+        seqs = [seq for seq, _, _ in lote]
+        with self._lock:
+            with self._con:
+                self._con.execute(
+                    f"DELETE FROM fila WHERE seq IN ({', '.join('?' * len(seqs))})", seqs
+                )
+            self._pendentes[tabela] = self._pendentes[tabela][len(lote):]
+            agora = time.monotonic()
+            self._recentes.setdefault(tabela, []).extend((agora, seq, e) for seq, e, _ in lote)
+            self._espera.pop(tabela, None)
+            self._erro = self._erro_falha  # a falha passageira passou; abandonadas seguem avisando
+            self._versao += 1
+
+    def _falhou(self, tabela: str, lote: list, erro: Exception) -> None:
+        tentativas = max(t for _, _, t in lote) + 1
+        seqs = [seq for seq, _, _ in lote]
+        desiste = tentativas >= TENTATIVAS_FILA
+        print(f"[conversa_banco] escrita em {tabela} falhou ({tentativas}/{TENTATIVAS_FILA}): {erro}")
+        with self._lock:
+            with self._con:
+                self._con.execute(
+                    f"UPDATE fila SET tentativas = ?, erro = ?, falhou = ? "
+                    f"WHERE seq IN ({', '.join('?' * len(seqs))})",
+                    [tentativas, str(erro), int(desiste)] + seqs,
+                )
+            self._erro = f"{tabela}: {erro}"
+            if desiste:
+                # ❌ Fica no diário (falhou = 1) para conferência; sai da fila e da tela
+                self._erro_falha = self._erro
+                self._pendentes[tabela] = self._pendentes[tabela][len(lote):]
+                self._falhas += len(lote)
+                self._versao += 1
+            else:
+                for item in lote:
+                    item[2] = tentativas
+                self._espera[tabela] = time.monotonic() + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativas)
+
+    # ─── Leituras (direto no backend de origem) ──────────────────
+    def select_aba(self, tabela, tipos_colunas, colunas=None):
+        return self.origem.select_aba(tabela, tipos_colunas, colunas)
+
+    def select_protocolos(self, tipos_colunas, colunas=None):
+        return self.origem.select_protocolos(tipos_colunas, colunas)
+
+    # ─── Escritas (diário + memória) ─────────────────────────────
+    def insert(self, tabela, dados, tipos_colunas=None):
+        registros = _registros_com_id(dados)  # ID gerado agora: a tela e a planilha usam o mesmo
+        if registros:
+            self._enfileira(tabela, {"operacao": "insert", "registros": _limpos(registros)})
+
+    def update(self, tabela, campos, valores, where, tipos_colunas):
+        filtros = _filtros(where)
+        linhas = int(_mascara_crua(self._atual(tabela), filtros, tabela).sum())
+        self._enfileira(tabela, {
+            "operacao": "update",
+            "campos": list(campos),
+            "valores": [_valor_celula(v) for v in valores],
+            "where": filtros,
+        })
+        return linhas
+
+    def delete(self, tabela, where, tipos_colunas):
+        filtros = _filtros(where)
+        linhas = int(_mascara_crua(self._atual(tabela), filtros, tabela).sum())
+        self._enfileira(tabela, {"operacao": "delete", "where": filtros})
+        return linhas
+
+    def delete_many(self, tabela, ids, id_col="ID"):
+        if not len(ids):
+            return 0
+        return self.delete(tabela, em(id_col, list(ids)), {})
+
+    def upsert(self, tabela, dados, key="ID", tipos_colunas=None, so_atualiza=False):
+        registros = _registros(dados)
+        if not registros:
+            return _resultado_upsert([], key, [])
+        diferencas = _diferencas(self._atual(tabela), registros, key)
+        novos = [] if so_atualiza else [r for r, mudou in diferencas if mudou is None]
+        if novos or any(mudou for _, mudou in diferencas):
+            _registros_com_id(novos)  # como o insert
+            self._enfileira(tabela, {"operacao": "upsert", "registros": _limpos(registros), "key": key,
+                                     "so_atualiza": so_atualiza})
+        ausente = "ausente" if so_atualiza else "inserido"
+        estados = [ausente if m is None else "atualizado" if m else "inalterado" for _, m in diferencas]
+        return _resultado_upsert(registros, key, estados)
+
+    def move(self, id_linha, de, para, alteracoes=None, id_col="ID", tipos_colunas=None):
+        alteracoes = {c: _valor_celula(v) for c, v in (alteracoes or {}).items()}
+        if de == para:
+            if not alteracoes:
+                return 0
+            return self.update(de, list(alteracoes), list(alteracoes.values()), eq(id_col, id_linha), {})
+        atual = self._atual(de)
+        linhas = atual[_mascara_crua(atual, [eq(id_col, id_linha)], de)]
+        if linhas.empty:
+            return 0
+        # Como a tela vai mostrar no destino até a gravação (a planilha relê a linha ao gravar)
+        nomes = {str(c).strip().lower(): c for c in linhas.columns}
+        mudou = {nomes.get(c.strip().lower(), c.strip()): v for c, v in alteracoes.items()}
+        registros = [{**r, **mudou} for r in _limpos(linhas.to_dict("records"))]
+        self._enfileira(de, {
+            "operacao": "move",
+            "id": _valor_celula(id_linha),
+            "id_col": id_col,
+            "para": para,
+            "alteracoes": alteracoes,
+            "registros": registros,
+        })
+        return len(registros)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Painel de depuração (somente admin):
+• Chamadas à API do Google Sheets feitas neste rerun
+• Totais por operação/aba e por página (histórico em memória)
+"""
+
+import streamlit as st
+from funcoes_compartilhadas.conversa_banco import chamadas_api, ARQUIVO_LOG_API
+
+# ─── Totais de um conjunto de registros ──────────────────────────
+def _totais(df):
+    return {
+        "Chamadas": len(df),
+        "Latência (s)": round(df["latencia_ms"].sum() / 1000, 2),
+        "KB recebidos": round(df["bytes_recebidos"].sum() / 1024, 1),
+        "Retentativas": int(df["retentativas"].sum()),
+    }
+
+# ─── Painel na barra lateral ─────────────────────────────────────
+def painel_api() -> None:
+    df = chamadas_api()
+    tot = _totais(df)
+    with st.sidebar.expander(f"🛠️ API Sheets: {tot['Chamadas']} chamada(s) neste rerun"):
+        c1, c2 = st.columns(2)
+        c1.metric("Chamadas", tot["Chamadas"])
+        c2.metric("Latência (s)", tot["Latência (s)"])
+        c1.metric("KB recebidos", tot["KB recebidos"])
+        c2.metric("Retentativas", tot["Retentativas"])
+
+        if not df.empty:
+            st.caption("Por operação e aba")
+            st.dataframe(
+                df.groupby(["operacao", "chamada", "aba"], as_index=False)
+                  .agg(n=("chamada", "size"), ms=("latencia_ms", "sum"), bytes=("bytes_recebidos", "sum"))
+                  .sort_values("ms", ascending=False),
+                hide_index=True, use_container_width=True,
+            )
+
+        historico = chamadas_api(somente_execucao_atual=False)
+        if not historico.empty:
+            st.caption("Por página (histórico em memória, todas as sessões)")
+            st.dataframe(
+                historico.groupby("pagina", as_index=False)
+                         .agg(n=("chamada", "size"), ms=("latencia_ms", "sum"),
+                              retentativas=("retentativas", "sum"))
+                         .sort_values("n", ascending=False),
+                hide_index=True, use_container_width=True,
+            )
+        st.caption(f"Histórico completo: `{ARQUIVO_LOG_API}`")
@@ -108,7 +108,7 @@ def _to_float(v):
     return v
 
 
-def salvar_edicoes(editado, original, editaveis: List[str], fn_update: Callable, tabela: str, id_col: str, tipos: dict):
+def salvar_edicoes(editado, original, editaveis: List[str], fn_upsert: Callable, tabela: str, id_col: str, tipos: dict):
     if editado.empty:
         return
 
@@ -121,23 +121,21 @@ def salvar_edicoes(editado, original, editaveis: List[str], fn_update: Callable,
         o = original.loc[int(row["_row"])]
         diff = {c: _to_float(row[c]) for c in editaveis if str(_to_float(row[c])) != str(o.get(c, ""))}
         if diff:
-            changes.append({"id": o[id_real], "val": diff})
+            changes.append({id_real: o[id_real], **diff})
 
     if not changes:
         return
 
     if st.button("💾 Salvar Alterações"):
-        tot = 0
-        for ch in changes:
-            tot += fn_update(
-                tabela,
-                list(ch["val"].keys()),
-                list(ch["val"].values()),
-                where=f"{id_real},eq,{ch['id']}",
-                tipos_colunas=tipos,
-            )
+        # ✅ Todas as linhas editadas num único upsert (uma escrita em lote).
+        # Só atualiza: a linha levava apenas o ID + células editadas, e uma linha
+        # apagada nesse meio-tempo não pode voltar pela metade como inserção.
+        resultado = fn_upsert(tabela, changes, key=id_real, tipos_colunas=tipos, so_atualiza=True)
+        tot = int((resultado["resultado"] == "atualizado").sum())
+        ausentes = int((resultado["resultado"] == "ausente").sum())
         st.success(f"✅ {tot} registro(s) atualizado(s).")
-        st.cache_data.clear()
+        if ausentes:
+            st.warning(f"⚠️ {ausentes} registro(s) não existem mais e não foram gravados.")
         _rerun()
 
 
@@ -160,10 +158,9 @@ def opcoes_especiais(tabela: str, ids: List[Any], fn_delete: Callable, id_col: s
         if opcao == "🗑️ Deletar Linhas":
             if st.button("⚠️ Confirmar Deleção"):
                 aviso = st.info("DELETANDO DADOS, AGUARDE...")
-                tot = sum(fn_delete(tabela, f"{id_col},eq,{i}", tipos) for i in ids)
+                tot = fn_delete(tabela, ids, id_col=id_col)
                 aviso.empty()
                 st.success(f"🗑️ {tot} registro(s) deletado(s).")
-                st.cache_data.clear()
                 _rerun()
 
         # Clone
@@ -209,7 +206,6 @@ def opcoes_especiais(tabela: str, ids: List[Any], fn_delete: Callable, id_col: s
 
                 aviso.empty()
                 st.success(f"✅ {len(novos)} registro(s) inserido(s).")
-                st.cache_data.clear()
                 st.rerun()
 
 
@@ -4,7 +4,7 @@
 import streamlit as st
 from datetime import datetime
 import random
-from funcoes_compartilhadas.conversa_banco import _sheet
+from funcoes_compartilhadas.conversa_banco import _aba, invalida_cache
 
 # --------------------------------------------------
 # CONFIGURAÇÕES
@@ -44,7 +44,7 @@ def app():
     with st.spinner("Atualizando IDs..."):
         for nome_aba in ABAS_CIDADES:
             try:
-                ws = _sheet.worksheet(nome_aba)
+                ws = _aba(nome_aba)
                 valores = ws.get_all_values()
 
                 if len(valores) <= 1:
@@ -69,6 +69,7 @@ def app():
                         total_geral += 1
 
                 if atualizados:
+                    invalida_cache(nome_aba)
                     st.success(f"✅ {atualizados} IDs criados na aba **{nome_aba}**")
 
             except Exception as e:
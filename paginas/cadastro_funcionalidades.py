@@ -1,15 +1,10 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from funcoes_compartilhadas import conversa_banco, trata_tabelas
+from funcoes_compartilhadas import conversa_banco, esquemas, trata_tabelas
 
 TABELA = "funcionalidades"
-TIPOS = {
-    "ID": "id",
-    "ID_Menu": "texto",
-    "Nome": "texto",
-    "Caminho": "texto",
-}
+TIPOS = esquemas.FUNCIONALIDADES
 
 def app():
     st.subheader("⚙️ Cadastro de Funcionalidades")
@@ -17,9 +12,7 @@ def app():
     trata_tabelas.gerenciar_estado_grid("cadastro_funcionalidades")
 
     # 🔍 Busca menus cadastrados
-    df_menus = conversa_banco.select("menus", {
-        "ID": "id", "Nome": "texto", "Ordem": "numero100"
-    })
+    df_menus = conversa_banco.select("menus", esquemas.MENUS)
 
     if df_menus.empty:
         st.error("⚠️ Cadastre um menu antes.")
@@ -50,7 +43,6 @@ def app():
                     }
                     conversa_banco.insert(TABELA, dado)
                     st.success("✅ Funcionalidade cadastrada com sucesso.")
-                    st.cache_data.clear()
                     st.rerun()
 
     # ▶️ Grid de Funcionalidades
@@ -67,12 +59,12 @@ def app():
     trata_tabelas.salvar_edicoes(
         edit, df,
         ["ID_Menu", "Nome", "Caminho"],
-        conversa_banco.update,
+        conversa_banco.upsert,
         TABELA, "ID", TIPOS,
     )
 
     trata_tabelas.opcoes_especiais(
         TABELA, ids,
-        conversa_banco.delete,
+        conversa_banco.delete_many,
         "ID", TIPOS,
     )
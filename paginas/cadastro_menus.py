@@ -1,14 +1,10 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from funcoes_compartilhadas import conversa_banco, trata_tabelas
+from funcoes_compartilhadas import conversa_banco, esquemas, trata_tabelas
 
 TABELA = "menus"
-TIPOS = {
-    "ID": "id",
-    "Nome": "texto",
-    "Ordem": "numero100",
-}
+TIPOS = esquemas.MENUS
 
 def app():
     st.subheader("🗂️ Cadastro de Menus")
@@ -32,7 +28,6 @@ def app():
                     }
                     conversa_banco.insert(TABELA, dado)
                     st.success("✅ Menu cadastrado com sucesso.")
-                    st.cache_data.clear()
                     st.rerun()
 
     # ▶️ Grid de Menus
@@ -49,12 +44,12 @@ def app():
     trata_tabelas.salvar_edicoes(
         edit, df,
         ["Nome", "Ordem"],
-        conversa_banco.update,
+        conversa_banco.upsert,
         TABELA, "ID", TIPOS,
     )
 
     trata_tabelas.opcoes_especiais(
         TABELA, ids,
-        conversa_banco.delete,
+        conversa_banco.delete_many,
         "ID", TIPOS,
     )
@@ -1,22 +1,16 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from funcoes_compartilhadas import conversa_banco
+from funcoes_compartilhadas import conversa_banco, esquemas
 
 TABELA = "permissoes"
-TIPOS = {
-    "ID": "id",
-    "ID_Usuario": "texto",
-    "ID_Funcionalidade": "texto",
-}
+TIPOS = esquemas.PERMISSOES
 
 def app():
     st.subheader("🔑 Gerenciar Permissões de Usuário")
 
     # 🔍 Busca usuários cadastrados (exceto admin)
-    df_usuarios = conversa_banco.select("usuarios", {
-        "ID": "id", "Nome": "texto", "Email": "texto", "Senha": "texto"
-    })
+    df_usuarios = conversa_banco.select("usuarios", esquemas.USUARIOS)
 
     df_usuarios = df_usuarios[df_usuarios["ID"] != "ADMIN"]
 
@@ -34,17 +28,8 @@ def app():
     st.markdown("---")
 
     # 🔍 Traz todas funcionalidades agrupadas por menu
-    df_funcionalidades = conversa_banco.select("funcionalidades", {
-        "ID": "id",
-        "ID_Menu": "texto",
-        "Nome": "texto",
-        "Caminho": "texto",
-    })
-    df_menus = conversa_banco.select("menus", {
-        "ID": "id",
-        "Nome": "texto",
-        "Ordem": "numero100",
-    }).sort_values("Ordem")
+    df_funcionalidades = conversa_banco.select("funcionalidades", esquemas.FUNCIONALIDADES)
+    df_menus = conversa_banco.select("menus", esquemas.MENUS, order_by="Ordem")
 
     # 🔍 Permissões atuais desse usuário
     df_permissoes = conversa_banco.select(TABELA, TIPOS)
@@ -85,12 +70,7 @@ def app():
     if st.button("💾 Salvar Permissões"):
         # Apaga permissões antigas desse usuário
         linhas_apagadas = df_permissoes[df_permissoes["ID_Usuario"] == usuario_id]
-        for _, linha in linhas_apagadas.iterrows():
-            conversa_banco.delete(
-                TABELA,
-                where=f"ID,eq,{linha['ID']}",
-                tipos_colunas=TIPOS,
-            )
+        conversa_banco.delete_many(TABELA, linhas_apagadas["ID"].tolist())
 
         # Insere novas permissões apenas com os IDs corretos
         novos = []
@@ -105,5 +85,4 @@ def app():
             conversa_banco.insert(TABELA, pd.DataFrame(novos))
 
         st.success("✅ Permissões atualizadas com sucesso.")
-        st.cache_data.clear()
         st.rerun()
@@ -1,16 +1,11 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from funcoes_compartilhadas import conversa_banco, trata_tabelas
+from funcoes_compartilhadas import conversa_banco, esquemas, trata_tabelas
 from funcoes_compartilhadas.controle_acesso import hash_senha
 
 TABELA = "usuarios"
-TIPOS = {
-    "ID": "id",
-    "Nome": "texto",
-    "Email": "texto",
-    "Senha": "texto",
-}
+TIPOS = esquemas.USUARIOS
 
 def app():
     st.subheader("👥 Cadastro de Usuários")
@@ -39,7 +34,6 @@ def app():
                     }
                     conversa_banco.insert(TABELA, dado)
                     st.success("✅ Usuário cadastrado com sucesso.")
-                    st.cache_data.clear()
                     st.rerun()
 
     # ▶️ Grid de Usuários
@@ -56,12 +50,12 @@ def app():
     trata_tabelas.salvar_edicoes(
         edit, df,
         ["Nome", "Email"],
-        conversa_banco.update,
+        conversa_banco.upsert,
         TABELA, "ID", TIPOS,
     )
 
     trata_tabelas.opcoes_especiais(
         TABELA, ids,
-        conversa_banco.delete,
+        conversa_banco.delete_many,
         "ID", TIPOS,
     )
@@ -4,25 +4,9 @@ import pandas as pd
 from datetime import date, timedelta
 import math
 
-from paginas.protocolos import formulario_protocolo, TIPOS_COLUNAS
+from paginas.protocolos import formulario_protocolo, salvar_protocolo, TIPOS_COLUNAS
 from funcoes_compartilhadas.conversa_banco import select_protocolos, select, update, delete, insert
-
-import pandas as pd
-
-def corrige_data(valor):
-    try:
-        if pd.isna(valor) or str(valor).strip() == "":
-            return ""
-        if str(valor).isdigit():
-            data = pd.to_datetime("1899-12-30") + pd.to_timedelta(int(valor), unit="D")
-            return data.strftime("%d/%m/%Y")
-        else:
-            data = pd.to_datetime(str(valor), dayfirst=True, errors="coerce")
-            if pd.notna(data):
-                return data.strftime("%d/%m/%Y")
-            return str(valor)
-    except Exception:
-        return str(valor)
+from funcoes_compartilhadas.esquemas import EVENTOS, texto_data, para_exibicao
 
 # ---------------------------------------------------------
 # PAGINAÇÃO PADRÃO (REUTILIZÁVEL EM QUALQUER ABA)
@@ -111,13 +95,7 @@ def listar_protocolos(df_filtrado, TABELA, contexto):
                 excluir = c2.form_submit_button("🗑️ Excluir")
 
                 if atualizar:
-                    update(
-                        row["Cidade"],
-                        list(dados.keys()),
-                        list(dados.values()),
-                        where=f"ID,eq,{row['ID']}",
-                        tipos_colunas=TIPOS_COLUNAS
-                    )
+                    salvar_protocolo(str(row["Cidade"]), row["ID"], dados)
                     st.success("✅ Atualizado com sucesso!")
                     st.rerun()
 
@@ -130,7 +108,7 @@ def listar_protocolos(df_filtrado, TABELA, contexto):
 
                 if col1.button("Confirmar", key=f"del_{contexto}_{row['ID']}"):
                     delete(
-                        row["Cidade"],
+                        str(row["Cidade"]),
                         where=f"ID,eq,{row['ID']}",
                         tipos_colunas=TIPOS_COLUNAS
                     )
@@ -148,12 +126,7 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
 
     termo = st.text_input("🔍 Buscar protocolo (por nome, CPF, militar, tipo...)", placeholder="")
 
-    df = select_protocolos(TIPOS_COLUNAS)
-
-    # Corrige datas vindas como número (Sheets)
-    for col in ["Data de Protocolo", "Validade do Boleto", "Validade do Cercon"]:
-        if col in df.columns:
-            df[col] = df[col].apply(corrige_data)
+    df = select_protocolos(TIPOS_COLUNAS)  # datas já em datetime64 pelo esquema
 
 
     if not admin:
@@ -166,14 +139,12 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
 
     if termo:
         termo = termo.lower()
-        df = df[df.apply(lambda r: termo in str(r.values).lower(), axis=1)]
+        df = df[para_exibicao(df).apply(lambda r: termo in str(r.values).lower(), axis=1)]
 
     if df.empty:
         st.info("Nenhum protocolo encontrado.")
         
 
-    df["DataProt_dt"] = pd.to_datetime(df["Data de Protocolo"], dayfirst=True, errors="coerce")
-
     df_atr = df[df["Militar Responsável"] == nome_militar]
 
     # 🔒 Controle de IDs já exibidos para evitar repetições nas abas
@@ -284,18 +255,11 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
                         insert(
                             "eventos",
                             evento,
-                            tipos_colunas={
-                                "ID": "id",
-                                "Data": "data",
-                                "Título": "texto",
-                                "Descrição": "texto"
-                            }
+                            tipos_colunas=EVENTOS
                         )
 
                         st.success("✅ Evento cadastrado com sucesso!")
 
-                        st.cache_data.clear()
-
                         st.rerun()
 
         # ---------------------------------------------------
@@ -303,12 +267,7 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
         # ---------------------------------------------------
         df_eventos = select(
             "eventos",
-            {
-                "ID": "id",
-                "Data": "data",
-                "Título": "texto",
-                "Descrição": "texto"
-            }
+            EVENTOS
         )
 
         # GARANTE DATAFRAME
@@ -326,33 +285,23 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
         else:
 
             # ---------------------------------------------------
-            # LIMPA E CONVERTE DATAS
+            # REMOVE DATAS INVÁLIDAS (já chegam em datetime64)
             # ---------------------------------------------------
-            df_eventos["Data"] = df_eventos["Data"].astype(str).str.strip()
-
-            df_eventos["Data_dt"] = pd.to_datetime(
-                df_eventos["Data"],
-                format="%d/%m/%Y",
-                dayfirst=True,
-                errors="coerce"
-            )
-
-            # REMOVE DATAS INVÁLIDAS
-            df_eventos = df_eventos[df_eventos["Data_dt"].notna()]
+            df_eventos = df_eventos[df_eventos["Data"].notna()]
 
             # ---------------------------------------------------
             # FILTRA PELO MÊS DA DATA ESCOLHIDA
             # ---------------------------------------------------
             df_mes = df_eventos[
-                (df_eventos["Data_dt"].dt.month == data_escolhida.month) &
-                (df_eventos["Data_dt"].dt.year == data_escolhida.year)
+                (df_eventos["Data"].dt.month == data_escolhida.month) &
+                (df_eventos["Data"].dt.year == data_escolhida.year)
             ].copy()
 
             # ---------------------------------------------------
             # ORDENA DA MAIS RECENTE PARA MAIS ANTIGA
             # ---------------------------------------------------
             df_mes = df_mes.sort_values(
-                by="Data_dt",
+                by="Data",
                 ascending=False
             )
 
@@ -381,7 +330,7 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
 
                             st.markdown(
                                 f"""
-                                ### 📅 {evento['Data']}
+                                ### 📅 {texto_data(evento['Data'])}
 
                                 **{evento['Título']}**
 
@@ -400,7 +349,7 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
 
                                     edit_data = st.date_input(
                                         "Data",
-                                        value=evento["Data_dt"].date(),
+                                        value=evento["Data"].date(),
                                         format="DD/MM/YYYY",
                                         key=f"edit_data_{evento['ID']}"
                                     )
@@ -437,18 +386,11 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
                                                 edit_descricao.strip()
                                             ],
                                             where=f"ID,eq,{str(evento['ID']).strip()}",
-                                            tipos_colunas={
-                                                "ID": "id",
-                                                "Data": "data",
-                                                "Título": "texto",
-                                                "Descrição": "texto"
-                                            }
+                                            tipos_colunas=EVENTOS
                                         )
 
                                         st.success("✅ Evento atualizado!")
 
-                                        st.cache_data.clear()
-
                                         st.rerun()
 
                         # ----------------------------------------
@@ -467,15 +409,11 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
                                 delete(
                                     "eventos",
                                     where=f"ID,eq,{str(evento['ID']).strip()}",
-                                    tipos_colunas={
-                                        "ID": "id"
-                                    }
+                                    tipos_colunas=EVENTOS
                                 )
 
                                 st.success("🗑️ Evento removido!")
 
-                                st.cache_data.clear()
-
                                 st.rerun()
     
 
@@ -496,8 +434,7 @@ def app(nome_militar, TABELA="Protocolos", admin=False):
         import numpy as np
 
         df_grafico = df.copy()
-        df_grafico["DataProt_dt"] = pd.to_datetime(df_grafico["Data de Protocolo"], dayfirst=True, errors="coerce")
-        df_grafico["Mês"] = df_grafico["DataProt_dt"].dt.strftime("%m - %B")
+        df_grafico["Mês"] = df_grafico["Data de Protocolo"].dt.strftime("%m - %B")
 
         andamento_map = {
         "Em andamento": ["Protocolado", "Vistoria Feita"],
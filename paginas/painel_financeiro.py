@@ -7,6 +7,7 @@ from io import BytesIO
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from funcoes_compartilhadas.conversa_banco import select, insert, delete
+from funcoes_compartilhadas.esquemas import PAINEL_FINANCEIRO
 
 
 TABELA = "painel_financeiro"
@@ -58,22 +59,17 @@ def app_financeiro():
     # ----------------------------------------------------
     # CARREGAR DADOS
     # ----------------------------------------------------
-    df = select(TABELA, tipos_colunas={
-    "Data": "data",
-    "Valor": "numero",
-    "Status": "texto",
-    "Observação": "texto"
-})
+    df = select(TABELA, tipos_colunas=PAINEL_FINANCEIRO)
 
 
     
 
 
     if df.empty:
-        df = pd.DataFrame(columns=["Data", "Valor", "Status", "Observação"])
+        df = pd.DataFrame(columns=["Data", "Valor", "Status", "Observação"]).astype({"Data": "datetime64[ns]"})
 
     df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce").fillna(0)
-    df["Data"] = pd.to_datetime(df["Data"], dayfirst=True, errors="coerce")
+    # "Data" já chega em datetime64 pelo esquema (serial ou dd/mm/aaaa)
 
     # ----------------------------------------------------
     # SELETOR DE MÊS
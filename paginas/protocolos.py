@@ -3,31 +3,18 @@ import streamlit as st
 import pandas as pd
 from datetime import date, timedelta, datetime
 import math
-from funcoes_compartilhadas.conversa_banco import select, insert, update, delete
+from funcoes_compartilhadas.conversa_banco import select, insert, update, delete, move
 from funcoes_compartilhadas.cria_id import cria_id
+from funcoes_compartilhadas.esquemas import (
+    PROTOCOLOS, EVENTOS, TIPOS_SERVICO, MILITARES, ANDAMENTOS, CIDADES,
+    texto_data, para_exibicao,
+)
 
 # -----------------------------------------------------------
 #                CONFIGURAÇÕES INICIAIS
 # -----------------------------------------------------------
 
-TIPOS_COLUNAS = {
-    "ID": "id",
-    "Data de Protocolo": "data",
-    "Nº de Protocolo": "texto",
-    "Tipo de Serviço": "texto",
-    "CPF/CNPJ": "texto",
-    "Nome Fantasia": "texto",
-    "Área (m²)": "numero",
-    "Notificação": "texto",
-    "Validade do Boleto": "data",
-    "Validade do Cercon": "data",
-    "Tipo de Empresa": "texto",
-    "Contato": "texto",
-    "Militar Responsável": "texto",
-    "Andamento": "texto",
-    "Cidade": "texto"
-    
-}
+TIPOS_COLUNAS = PROTOCOLOS  # registro central: funcoes_compartilhadas/esquemas.py
 
 # -----------------------------------------------------------
 #                 FUNÇÕES AUXILIARES
@@ -46,38 +33,33 @@ def sanitize_number(value, default=0.0):
 
 
 def carregar_dados(TABELA):
-    def corrige_data(valor):
-        try:
-            if pd.isna(valor) or str(valor).strip() == "":
-                return ""
-            if str(valor).isdigit():
-                data = pd.to_datetime("1899-12-30") + pd.to_timedelta(int(valor), unit="D")
-                return data.strftime("%d/%m/%Y")
-            else:
-                data = pd.to_datetime(str(valor), dayfirst=True, errors="coerce")
-                if pd.notna(data):
-                    return data.strftime("%d/%m/%Y")
-                return str(valor)
-        except Exception:
-            return str(valor)
-
-    # Puxa os dados do banco
+    # Puxa os dados do banco (datas já chegam em datetime64 pelo esquema)
     dados = select(TABELA, TIPOS_COLUNAS)
     df = pd.DataFrame(dados)
 
     # Garante que todas as colunas da estrutura estão no df, mesmo vazio
-    for col in TIPOS_COLUNAS:
+    for col, tipo in TIPOS_COLUNAS.items():
         if col not in df.columns:
-            df[col] = ""
-
-    # Corrige as datas
-    for coluna in ["Data de Protocolo", "Validade do Boleto", "Validade do Cercon"]:
-        if coluna in df.columns:
-            df[coluna] = df[coluna].apply(corrige_data)
+            df[col] = pd.NaT if tipo == "data" else ""
 
     return df
 
 
+def salvar_protocolo(tabela, id_protocolo, dados):
+    # Se a cidade mudou, o protocolo vai para a aba da nova cidade (senão ficaria na antiga)
+    destino = str(dados.get("Cidade") or tabela)
+    if destino != tabela:
+        move(id_protocolo, tabela, destino, dados, tipos_colunas=TIPOS_COLUNAS)
+    else:
+        update(
+            tabela,
+            list(dados.keys()),
+            list(dados.values()),
+            where=f"ID,eq,{id_protocolo}",
+            tipos_colunas=TIPOS_COLUNAS
+        )
+
+
 
 # -----------------------------------------------------------
 #                 FORMULÁRIO DE PROTOCOLOS
@@ -108,18 +90,10 @@ def formulario_protocolo(dados=None, prefix=""):
 
     # -------- COLUNA 1 --------
     with col1:
-        data_raw = st.text_input("Data de Protocolo (dd/mm/aaaa)", value=dados.get("Data de Protocolo", ""), key=f"data_{prefix}")
+        data_raw = st.text_input("Data de Protocolo (dd/mm/aaaa)", value=texto_data(dados.get("Data de Protocolo")), key=f"data_{prefix}")
         protocolo = st.text_input("Nº de Protocolo", value=dados.get("Nº de Protocolo", ""), key=f"prot_{prefix}")
 
-        opcoes_tipo = [
-            "Vistoria para Funcionamento",
-            "Licenciamento Facilitado",
-            "Análise de Projeto",
-            "Substituição de Projeto",
-            "Ponto de Referência",
-            "Credenciamento Extintor/Brigada",
-            "Denúncia"
-        ]
+        opcoes_tipo = TIPOS_SERVICO
         tipo_valor = dados.get("Tipo de Serviço") or opcoes_tipo[0]
         tipo_index = opcoes_tipo.index(tipo_valor) if tipo_valor in opcoes_tipo else 0
         tipo = st.selectbox("Tipo de Serviço", opcoes_tipo, index=tipo_index, key=f"tipo_{prefix}")
@@ -140,10 +114,10 @@ def formulario_protocolo(dados=None, prefix=""):
         except ValueError:
             data_dt = None
 
-        validade_boleto_auto = (data_dt + timedelta(days=30)).strftime("%d/%m/%Y") if data_dt else dados.get("Validade do Boleto", "")
+        validade_boleto_auto = (data_dt + timedelta(days=30)).strftime("%d/%m/%Y") if data_dt else texto_data(dados.get("Validade do Boleto"))
         validade_boleto = st.text_input("Validade do Boleto (dd/mm/aaaa)", value=validade_boleto_auto, key=f"valboleto_{prefix}")
 
-        validade_cercon = st.text_input("Validade do Cercon (dd/mm/aaaa)", value=dados.get("Validade do Cercon", ""), key=f"valcercon_{prefix}")
+        validade_cercon = st.text_input("Validade do Cercon (dd/mm/aaaa)", value=texto_data(dados.get("Validade do Cercon")), key=f"valcercon_{prefix}")
 
 
         opcoes_empresa = ["Regular", "Isento", "MEI", "Evento Temporário"]
@@ -153,27 +127,17 @@ def formulario_protocolo(dados=None, prefix=""):
 
         contato = st.text_input("Contato", value=dados.get("Contato", ""), key=f"cont_{prefix}")
 
-        opcoes_militar = ["2° Ten D'Lauan", "2° Sgt Tamilla", "2° Sgt Ribeiro", "2° Sgt Éderson","Sd Amanda"]
+        opcoes_militar = MILITARES
         militar_valor = dados.get("Militar Responsável") or opcoes_militar[0]
         militar_index = opcoes_militar.index(militar_valor) if militar_valor in opcoes_militar else 0
         militar = st.selectbox("Militar Responsável", opcoes_militar, index=militar_index, key=f"mil_{prefix}")
 
-        opcoes_andamento = [
-            "Protocolado",
-            "Vistoria Feita",
-            "Cercon Impresso",
-            "Empresa Encerrou",
-            "Empresa/Proprietário Não Localizado",
-            "Não Certificou"
-        ]
+        opcoes_andamento = ANDAMENTOS
         andamento_valor = dados.get("Andamento") or opcoes_andamento[0]
         andamento_index = opcoes_andamento.index(andamento_valor) if andamento_valor in opcoes_andamento else 0
         andamento = st.selectbox("Andamento", opcoes_andamento, index=andamento_index, key=f"and_{prefix}")
 
-        opcoes_cidade = [
-            "Porangatu", "Santa Tereza", "Estrela do Norte", "Formoso",
-            "Trombas", "Novo Planalto", "Montividiu", "Mutunópolis"
-        ]
+        opcoes_cidade = CIDADES
         cidade_valor = dados.get("Cidade") or opcoes_cidade[0]
         cidade_index = opcoes_cidade.index(cidade_valor) if cidade_valor in opcoes_cidade else 0
         cidade = st.selectbox("Cidade", opcoes_cidade, index=cidade_index, key=f"cid_{prefix}")
@@ -264,7 +228,7 @@ def app(TABELA):
 
     if termo:
         termo_low = termo.lower()
-        df = df[df.apply(lambda r: termo_low in str(r.values).lower(), axis=1)]
+        df = df[para_exibicao(df).apply(lambda r: termo_low in str(r.values).lower(), axis=1)]
 
     st.divider()
 
@@ -308,33 +272,15 @@ def app(TABELA):
                 "Cidade": dados_novos["Cidade"]
 
             }
-            insert(TABELA, novo)
+            insert(TABELA, novo, tipos_colunas=TIPOS_COLUNAS)
             st.success("✅ Novo protocolo salvo com sucesso!")
             st.rerun()
 
     st.divider()
     st.subheader(f"📋 Protocolos Encontrados: {total_registros}")
  
-    df_temp = df_all.copy()
-
-    # Conversão segura das datas
-    df_temp["Validade_dt"] = pd.to_datetime(
-        df_temp["Validade do Cercon"],
-        format="%d/%m/%Y",
-        errors="coerce"
-    )
-
-    df_temp["Boleto_dt"] = pd.to_datetime(
-        df_temp["Validade do Boleto"],
-        format="%d/%m/%Y",
-        errors="coerce"
-    )
-
-    df_temp["DataProt_dt"] = pd.to_datetime(
-        df_temp["Data de Protocolo"],
-        format="%d/%m/%Y",
-        errors="coerce"
-    )
+    # As datas já chegam em datetime64 (convertidas uma vez na leitura)
+    df_temp = df_all
 
     hoje = date.today()
     limite_proximo = hoje + timedelta(days=30)
@@ -349,17 +295,14 @@ def app(TABELA):
 #     BADGES DINÂMICOS NAS ABAS (minimalistas e atualizados)
 # -----------------------------------------------------------
 
-    df_alert = df_all.copy()
-    df_alert["Validade_dt"] = pd.to_datetime(df_alert["Validade do Cercon"], format="%d/%m/%Y", errors="coerce")
-    df_alert["Boleto_dt"] = pd.to_datetime(df_alert["Validade do Boleto"], format="%d/%m/%Y", errors="coerce")
-    df_alert["DataProt_dt"] = pd.to_datetime(df_alert["Data de Protocolo"],format="%d/%m/%Y",dayfirst=True,errors="coerce") 
-    
+    df_alert = df_all
+
     ids_exibidos = set()
 
     # --- CERCONS PRÓXIMOS ---
     df_proximos = df_alert[
-        (df_alert["Validade_dt"] >= pd.Timestamp(hoje)) &
-        (df_alert["Validade_dt"] <= pd.Timestamp(limite_proximo))
+        (df_alert["Validade do Cercon"] >= pd.Timestamp(hoje)) &
+        (df_alert["Validade do Cercon"] <= pd.Timestamp(limite_proximo))
     ]
     df_proximos = df_proximos[~df_proximos["ID"].isin(ids_exibidos)]
     ids_exibidos.update(df_proximos["ID"])
@@ -367,8 +310,8 @@ def app(TABELA):
 
     # --- CERCONS VENCIDOS ---
     df_vencidos = df_alert[
-        (df_alert["Validade_dt"] < pd.Timestamp(hoje)) &
-        (df_alert["Validade_dt"] >= pd.Timestamp(limite_vencidos))
+        (df_alert["Validade do Cercon"] < pd.Timestamp(hoje)) &
+        (df_alert["Validade do Cercon"] >= pd.Timestamp(limite_vencidos))
     ]
     df_vencidos = df_vencidos[~df_vencidos["ID"].isin(ids_exibidos)]
     ids_exibidos.update(df_vencidos["ID"])
@@ -379,7 +322,7 @@ def app(TABELA):
     df_semcercon = df_alert[
         (df_alert["Andamento"] == "Não Certificou") |
         (
-            (df_alert["Boleto_dt"] + pd.Timedelta(days=150) < pd.Timestamp(hoje)) &
+            (df_alert["Validade do Boleto"] + pd.Timedelta(days=150) < pd.Timestamp(hoje)) &
             (df_alert["Andamento"] != "Cercon Impresso")
         )
     ]
@@ -388,7 +331,7 @@ def app(TABELA):
     qtd_semcercon = df_semcercon.shape[0]
 
     # --- NOVOS ---
-    qtd_novos = df_alert[df_alert["DataProt_dt"].dt.date == hoje].shape[0]
+    qtd_novos = df_alert[df_alert["Data de Protocolo"].dt.normalize() == pd.Timestamp(hoje)].shape[0]
 
 
     # --- Construção dos badges ---
@@ -477,8 +420,6 @@ def app(TABELA):
 
                         st.success("✅ Evento cadastrado com sucesso!")
 
-                        st.cache_data.clear()
-
                         st.rerun()
 
         # ---------------------------------------------------
@@ -486,12 +427,7 @@ def app(TABELA):
         # ---------------------------------------------------
         df_eventos = select(
             "eventos",
-            {
-                "ID": "id",
-                "Data": "data",
-                "Título": "texto",
-                "Descrição": "texto"
-            }
+            EVENTOS
         )
 
         # GARANTE DATAFRAME
@@ -508,33 +444,23 @@ def app(TABELA):
         else:
 
             # ---------------------------------------------------
-            # LIMPA E CONVERTE DATAS
+            # REMOVE DATAS INVÁLIDAS (já chegam em datetime64)
             # ---------------------------------------------------
-            df_eventos["Data"] = df_eventos["Data"].astype(str).str.strip()
-
-            df_eventos["Data_dt"] = pd.to_datetime(
-                df_eventos["Data"],
-                format="%d/%m/%Y",
-                dayfirst=True,
-                errors="coerce"
-            )
-
-            # REMOVE DATAS INVÁLIDAS
-            df_eventos = df_eventos[df_eventos["Data_dt"].notna()]
+            df_eventos = df_eventos[df_eventos["Data"].notna()]
 
             # ---------------------------------------------------
             # FILTRA PELO MÊS DA DATA ESCOLHIDA
             # ---------------------------------------------------
             df_mes = df_eventos[
-                (df_eventos["Data_dt"].dt.month == data_escolhida.month) &
-                (df_eventos["Data_dt"].dt.year == data_escolhida.year)
+                (df_eventos["Data"].dt.month == data_escolhida.month) &
+                (df_eventos["Data"].dt.year == data_escolhida.year)
             ].copy()
 
             # ---------------------------------------------------
             # ORDENA DA MAIS RECENTE PARA MAIS ANTIGA
             # ---------------------------------------------------
             df_mes = df_mes.sort_values(
-                by="Data_dt",
+                by="Data",
                 ascending=False
             )
 
@@ -563,7 +489,7 @@ def app(TABELA):
 
                             st.markdown(
                                 f"""
-                                ### 📅 {evento['Data']}
+                                ### 📅 {texto_data(evento['Data'])}
 
                                 **{evento['Título']}**
 
@@ -582,7 +508,7 @@ def app(TABELA):
 
                                     edit_data = st.date_input(
                                         "Data",
-                                        value=evento["Data_dt"].date(),
+                                        value=evento["Data"].date(),
                                         format="DD/MM/YYYY",
                                         key=f"edit_data_{evento['ID']}"
                                     )
@@ -619,18 +545,11 @@ def app(TABELA):
                                                 edit_descricao.strip()
                                             ],
                                             where=f"ID,eq,{str(evento['ID']).strip()}",
-                                            tipos_colunas={
-                                                "ID": "id",
-                                                "Data": "data",
-                                                "Título": "texto",
-                                                "Descrição": "texto"
-                                            }
+                                            tipos_colunas=EVENTOS
                                         )
 
                                         st.success("✅ Evento atualizado!")
 
-                                        st.cache_data.clear()
-
                                         st.rerun()
 
                         # ----------------------------------------
@@ -649,24 +568,17 @@ def app(TABELA):
                                 delete(
                                     "eventos",
                                     where=f"ID,eq,{str(evento['ID']).strip()}",
-                                    tipos_colunas={
-                                        "ID": "id"
-                                    }
+                                    tipos_colunas=EVENTOS
                                 )
 
                                 st.success("🗑️ Evento removido!")
 
-                                st.cache_data.clear()
-
                                 st.rerun()
     
     # ---------------------------
     # 1️⃣ ABA: PROTOCOLOS ENCONTRADOS
     # ---------------------------
     with aba_princ:
-        # Cria coluna de data convertida
-        df["Validade_dt"] = pd.to_datetime(df["Validade do Cercon"], format="%d/%m/%Y", errors="coerce")
-
         # Cria coluna com o mês/ano no formato "Janeiro/2024"
         meses_pt = {
             1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril",
@@ -674,9 +586,10 @@ def app(TABELA):
             9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"
         }
 
-        df["MesAno"] = df["Validade_dt"].apply(
-            lambda d: f"{meses_pt.get(d.month, '')}/{d.year}" if pd.notna(d) else ""
-        )
+        validade = df["Validade do Cercon"]
+        df["MesAno"] = (
+            validade.dt.month.map(meses_pt) + "/" + validade.dt.year.astype("Int64").astype(str)
+        ).fillna("")
 
 
         # Lista de meses disponíveis
@@ -721,13 +634,7 @@ def app(TABELA):
                                 st.error("❌ Uma das datas está em formato inválido. Use dd/mm/aaaa.")
                                 st.stop()
 
-                            update(
-                                TABELA,
-                                list(dados.keys()),
-                                list(dados.values()),
-                                where=f"ID,eq,{row['ID']}",
-                                tipos_colunas=TIPOS_COLUNAS
-                            )
+                            salvar_protocolo(TABELA, row['ID'], dados)
                             st.success("✅ Protocolo atualizado com sucesso!")
                             st.rerun()
 
@@ -746,9 +653,9 @@ def app(TABELA):
         st.markdown("### 🟨 Cercons Próximos ao Vencimento (≤ 30 dias)")
 
         df_proximos = df_temp[
-            (df_temp["Validade_dt"] >= pd.Timestamp(hoje)) &
-            (df_temp["Validade_dt"] <= pd.Timestamp(limite_proximo))
-        ].sort_values("Validade_dt")
+            (df_temp["Validade do Cercon"] >= pd.Timestamp(hoje)) &
+            (df_temp["Validade do Cercon"] <= pd.Timestamp(limite_proximo))
+        ].sort_values("Validade do Cercon")
 
         df_proximos = paginar_dataframe(df_proximos, "prox")
 
@@ -779,13 +686,7 @@ def app(TABELA):
                         excluir = col2.form_submit_button("🗑️ Excluir")
 
                         if atualizar:
-                            update(
-                                TABELA,
-                                list(dados.keys()),
-                                list(dados.values()),
-                                where=f"ID,eq,{row['ID']}",
-                                tipos_colunas=TIPOS_COLUNAS
-                            )
+                            salvar_protocolo(TABELA, row['ID'], dados)
                             st.success("Atualizado!")
                             st.rerun()
 
@@ -816,9 +717,9 @@ def app(TABELA):
         st.markdown("### 🟥 Cercons Vencidos (últimos 365 dias)")
 
         df_vencidos = df_temp[
-            (df_temp["Validade_dt"] < pd.Timestamp(hoje)) &
-            (df_temp["Validade_dt"] >= pd.Timestamp(limite_vencidos))
-        ].sort_values("Validade_dt")
+            (df_temp["Validade do Cercon"] < pd.Timestamp(hoje)) &
+            (df_temp["Validade do Cercon"] >= pd.Timestamp(limite_vencidos))
+        ].sort_values("Validade do Cercon")
         df_vencidos = paginar_dataframe(df_vencidos, "venc")
 
         if df_vencidos.empty:
@@ -826,7 +727,7 @@ def app(TABELA):
         else:
             for idx, row in df_vencidos.iterrows():
 
-                dias_vencidos = (hoje - row["Validade_dt"].date()).days if pd.notna(row["Validade_dt"]) else "N/A"
+                dias_vencidos = (hoje - row["Validade do Cercon"].date()).days if pd.notna(row["Validade do Cercon"]) else "N/A"
 
                 # Verifica se está notificado
                 notificado = str(row.get("Notificação", "")).strip().lower() == "notificado"
@@ -848,13 +749,7 @@ def app(TABELA):
                         excluir = col2.form_submit_button("🗑️ Excluir")
 
                         if atualizar:
-                            update(
-                                TABELA,
-                                list(dados.keys()),
-                                list(dados.values()),
-                                where=f"ID,eq,{row['ID']}",
-                                tipos_colunas=TIPOS_COLUNAS
-                            )
+                            salvar_protocolo(TABELA, row['ID'], dados)
                             st.success("Atualizado!")
                             st.rerun()
 
@@ -885,8 +780,8 @@ def app(TABELA):
             st.markdown("### 🆕 Novos Protocolos Cadastrados Hoje")
 
             df_novos = df_temp[
-                (df_temp["DataProt_dt"].dt.date == hoje)
-            ].sort_values("DataProt_dt", ascending=False)
+                (df_temp["Data de Protocolo"].dt.normalize() == pd.Timestamp(hoje))
+            ].sort_values("Data de Protocolo", ascending=False)
             df_novos = paginar_dataframe(df_novos, "novos")
             if df_novos.empty:
                 st.info("Nenhum protocolo foi cadastrado hoje.")
@@ -910,13 +805,7 @@ def app(TABELA):
                             excluir = col2.form_submit_button("🗑️ Excluir")
 
                             if atualizar:
-                                update(
-                                    TABELA,
-                                    list(dados.keys()),
-                                    list(dados.values()),
-                                    where=f"ID,eq,{row['ID']}",
-                                    tipos_colunas=TIPOS_COLUNAS
-                                )
+                                salvar_protocolo(TABELA, row['ID'], dados)
                                 st.success("Atualizado!")
                                 st.rerun()
 
@@ -945,7 +834,7 @@ def app(TABELA):
         df_semcercon = df_alert[
             (df_alert["Andamento"] == "Não Certificou") |
             (
-                (df_alert["Boleto_dt"] + pd.Timedelta(days=150) < pd.Timestamp(hoje)) &
+                (df_alert["Validade do Boleto"] + pd.Timedelta(days=150) < pd.Timestamp(hoje)) &
                 (df_alert["Andamento"] != "Cercon Impresso")
             )
         ]
@@ -965,13 +854,7 @@ def app(TABELA):
                         excluir = col2.form_submit_button("🗑️ Excluir")
 
                         if atualizar:
-                            update(
-                                TABELA,
-                                list(dados.keys()),
-                                list(dados.values()),
-                                where=f"ID,eq,{row['ID']}",
-                                tipos_colunas=TIPOS_COLUNAS
-                            )
+                            salvar_protocolo(TABELA, row['ID'], dados)
                             st.success("✅ Protocolo atualizado com sucesso!")
                             st.rerun()
 
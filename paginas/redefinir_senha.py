@@ -3,6 +3,7 @@ import streamlit as st
 import random, string
 from funcoes_compartilhadas import conversa_banco
 from funcoes_compartilhadas.controle_acesso import hash_senha, image_base64
+from funcoes_compartilhadas.esquemas import USUARIOS
 from funcoes_compartilhadas.envia_email import enviar_email
 from funcoes_compartilhadas.estilos import set_page_title
 
@@ -17,12 +18,7 @@ aplicar_estilo_padrao()
 
 
 TABELA_USUARIOS = "usuarios"
-TIPOS_USUARIOS = {
-    "ID": "id",
-    "Nome": "texto",
-    "Email": "texto",
-    "Senha": "texto",
-}
+TIPOS_USUARIOS = USUARIOS
 
 def app():
 
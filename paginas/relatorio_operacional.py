@@ -4,74 +4,35 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
 
-from funcoes_compartilhadas.conversa_banco import select
+from funcoes_compartilhadas.conversa_banco import select_protocolos
 from funcoes_compartilhadas.gera_pdf_relatorio import gerar_pdf_relatorio
+from funcoes_compartilhadas.analise_operacional import resumo_operacional
+from funcoes_compartilhadas.esquemas import PROTOCOLOS, TIPOS_SERVICO, FORMATO_DATA
 
 # ---------------------------------------------------
 # CONFIGURAÇÕES
 # ---------------------------------------------------
 
-TIPOS_COLUNAS = {
-    "ID": "id",
-    "Data de Protocolo": "data",
-    "Nº de Protocolo": "texto",
-    "Tipo de Serviço": "texto",
-    "CPF/CNPJ": "texto",
-    "Nome Fantasia": "texto",
-    "Área (m²)": "numero",
-    "Notificação": "texto",
-    "Validade do Boleto": "data",
-    "Validade do Cercon": "data",
-    "Tipo de Empresa": "texto",
-    "Contato": "texto",
-    "Militar Responsável": "texto",
-    "Andamento": "texto",
-    "Cidade": "texto"
-}
 
-# ---------------------------------------------------
-# ABAS DO GOOGLE SHEETS
-# ---------------------------------------------------
-
-TABELAS = [
-    "Porangatu",
-    "Santa Tereza",
-    "Estrela do Norte",
-    "Formoso",
-    "Trombas",
-    "Novo Planalto",
-    "Montividiu",
-    "Mutunópolis"
+# Só as colunas que o relatório usa (Cidade vem do nome da aba)
+COLUNAS_RELATORIO = [
+    "ID",
+    "Data de Protocolo",
+    "Nº de Protocolo",
+    "Tipo de Serviço",
+    "Nome Fantasia",
+    "Notificação",
+    "Validade do Cercon",
+    "Militar Responsável",
+    "Andamento",
 ]
 
 # ---------------------------------------------------
-# CARREGA TODOS OS DADOS
+# CARREGA TODOS OS DADOS (as 8 abas de cidades numa leitura só)
 # ---------------------------------------------------
-@st.cache_data(ttl=60)
 def carregar_dados():
 
-
-    lista_df = []
-
-    for tabela in TABELAS:
-
-        dados = select(
-            tabela,
-            TIPOS_COLUNAS
-        )
-
-        df_temp = pd.DataFrame(dados)
-
-        if not df_temp.empty:
-            lista_df.append(df_temp)
-
-    if len(lista_df) == 0:
-        return pd.DataFrame()
-
-    return pd.concat(
-        lista_df,
-        ignore_index=True
-    )
+    return select_protocolos(PROTOCOLOS, colunas=COLUNAS_RELATORIO)
 
 
 # ---------------------------------------------------
@@ -99,29 +60,12 @@ def app():
 # TRATAMENTO DAS DATAS
 # ----------------------------------------------------
 
-    # Converte serial do Google Sheets para data real
-
-    df["DataProt_dt"] = pd.to_datetime(
-        pd.to_numeric(
-            df["Data de Protocolo"],
-            errors="coerce"
-        ),
-        unit="D",
-        origin="1899-12-30"
-    )
-    
-    df["Validade_dt"] = pd.to_datetime(
-    pd.to_numeric(
-        df["Validade do Cercon"],
-        errors="coerce"
-    ),
-    unit="D",
-    origin="1899-12-30"
-)
+    # As datas já chegam em datetime64 pelo esquema (serial do Sheets
+    # convertido uma vez na leitura); texto só na hora de exibir
 
     # Cria coluna de mês igual ao Financeiro
 
-    df["Mes"] = df["DataProt_dt"].dt.strftime("%m/%Y")
+    df["Mes"] = df["Data de Protocolo"].dt.strftime("%m/%Y")
     
 
     hoje = pd.Timestamp.today()
@@ -150,7 +94,7 @@ def app():
         meses = (
     df
     .assign(
-        MesRef=df["DataProt_dt"].dt.to_period("M")
+        MesRef=df["Data de Protocolo"].dt.to_period("M")
     )
     .sort_values(
         "MesRef",
@@ -192,38 +136,16 @@ def app():
 ]
 
     # --------------------------------------------
-    # RESUMO GERAL
+    # RESUMO GERAL + PENDÊNCIAS (uma consulta agrupada)
     # --------------------------------------------
 
-    protocolos = len(df)
+    ind, por_servico = resumo_operacional(df, hoje)
 
-    vistorias = len(
-        df[
-            df["Andamento"]
-            == "Vistoria Feita"
-        ]
-    )
-
-    cercons = len(
-        df[
-            df["Andamento"]
-            == "Cercon Impresso"
-        ]
-    )
-
-    nao_certificou = len(
-        df[
-            df["Andamento"]
-            == "Não Certificou"
-        ]
-    )
-
-    notificados = len(
-        df[
-            df["Notificação"]
-            == "Notificado"
-        ]
-    )
+    protocolos = ind["protocolos"]
+    vistorias = ind["vistorias"]
+    cercons = ind["cercons"]
+    nao_certificou = ind["nao_certificou"]
+    notificados = ind["notificados"]
 
     st.subheader("📌 Resumo Geral")
 
@@ -260,35 +182,10 @@ def app():
     # PENDÊNCIAS
     # --------------------------------------------
 
-    protocolados = len(
-        df[
-            df["Andamento"]
-            == "Protocolado"
-        ]
-    )
-
-    vistoria_sem_cercon = len(
-        df[
-            df["Andamento"]
-            == "Vistoria Feita"
-        ]
-    )
-
-    cercons_vencidos = len(
-        df[
-            df["Validade_dt"] < hoje
-        ]
-    )
-
-    cercons_30 = len(
-        df[
-            (df["Validade_dt"] >= hoje) &
-            (
-                df["Validade_dt"]
-                <= hoje + pd.Timedelta(days=30)
-            )
-        ]
-    )
+    protocolados = ind["protocolados"]
+    vistoria_sem_cercon = ind["vistoria_sem_cercon"]
+    cercons_vencidos = ind["cercons_vencidos"]
+    cercons_30 = ind["cercons_30"]
 
     st.subheader("🚨 Pendências")
 
@@ -324,16 +221,8 @@ def app():
 
     tipo_servico = st.selectbox(
         "Selecione o tipo de serviço",
-        [
-            "Todos",
-            "Vistoria para Funcionamento",
-            "Licenciamento Facilitado",
-            "Análise de Projeto",
-            "Substituição de Projeto",
-            "Ponto de Referência",
-            "Credenciamento Extintor/Brigada",
-            "Denúncia"
-        ]
+        ["Todos"] + TIPOS_SERVICO,
+        format_func=lambda t: f"{t} ({len(df) if t == 'Todos' else por_servico.get(t, 0)})"
     )
 
     df_servicos = df.copy()
@@ -347,8 +236,8 @@ def app():
         df_servicos = df_servicos.copy()
 
     df_servicos["Data de Protocolo"] = (
-        df_servicos["DataProt_dt"]
-        .dt.strftime("%d/%m/%Y")
+        df_servicos["Data de Protocolo"]
+        .dt.strftime(FORMATO_DATA)
     )
 
     colunas_exibir = [
@@ -377,6 +266,13 @@ def app():
 
     st.subheader("🚨 Pendências")
 
+    total_pendencia = {
+        "Protocolados sem vistoria": protocolados,
+        "Vistorias sem Cercon": vistoria_sem_cercon,
+        "Cercons vencidos": cercons_vencidos,
+        "Cercons vencendo em 30 dias": cercons_30,
+    }
+
     opcao_pendencia = st.selectbox(
         "Selecione a pendência",
         [
@@ -384,7 +280,8 @@ def app():
             "Vistorias sem Cercon",
             "Cercons vencidos",
             "Cercons vencendo em 30 dias"
-        ]
+        ],
+        format_func=lambda p: f"{p} ({total_pendencia[p]})"
     )
 
     hoje = pd.Timestamp.today()
@@ -408,15 +305,15 @@ def app():
     elif opcao_pendencia == "Cercons vencidos":
 
         df_pendencias = df[
-            df["Validade_dt"] < hoje
+            df["Validade do Cercon"] < hoje
         ]
 
     elif opcao_pendencia == "Cercons vencendo em 30 dias":
 
         df_pendencias = df[
-            (df["Validade_dt"] >= hoje) &
+            (df["Validade do Cercon"] >= hoje) &
             (
-                df["Validade_dt"]
+                df["Validade do Cercon"]
                 <= hoje + pd.Timedelta(days=30)
             )
         ]
@@ -442,8 +339,8 @@ def app():
         df_pendencias = df_pendencias.copy()
 
         df_pendencias["Data de Protocolo"] = (
-            df_pendencias["DataProt_dt"]
-            .dt.strftime("%d/%m/%Y")
+            df_pendencias["Data de Protocolo"]
+            .dt.strftime(FORMATO_DATA)
         )
 
     # --------------------------------------------
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from funcoes_compartilhadas import banco_sqlite
+from funcoes_compartilhadas.banco_sqlite import BackendReplica, BackendSQLite
+
+
+class PlanilhaFalsa:
+    """Planilha em memória: um BackendSQLite faz o papel do Google Sheets
+    (escritas da réplica) e a leitura em lote lê dele como o _le_abas"""
+
+    def __init__(self, arquivo):
+        self.origem = BackendSQLite(arquivo)
+        self.versao = "v1"  # modifiedTime
+        self.leituras = []
+
+    def le_abas(self, abas):
+        self.leituras.append(list(abas))
+        existentes = self.origem.tabelas()
+        with self.origem._lock:
+            return {nome: self.origem._le(nome) for nome in abas if nome in existentes}
+
+
+@pytest.fixture
+def planilha(tmp_path, monkeypatch):
+    planilha = PlanilhaFalsa(str(tmp_path / "planilha.sqlite3"))
+    planilha.origem.substitui("Porangatu", pd.DataFrame({"ID": ["p1", "p2"], "Nome Fantasia": ["X", "Z"]}))
+    planilha.origem.substitui("Formoso", pd.DataFrame({"ID": ["f1"], "Nome Fantasia": ["F"]}))
+    planilha.origem.substitui("menus", pd.DataFrame({"ID": ["m1", "m2"], "Nome": ["Início", "Cadastro"]}))
+    monkeypatch.setattr(banco_sqlite, "_le_abas", lambda abas: planilha.le_abas(abas))
+    monkeypatch.setattr(banco_sqlite, "_versao_planilha", lambda *a, **k: planilha.versao)
+    monkeypatch.setattr(BackendReplica, "_laco", lambda self: None)  # sincroniza só quando o teste pedir
+    return planilha
+
+
+@pytest.fixture
+def replica(planilha, tmp_path):
+    replica = BackendReplica(str(tmp_path / "replica.sqlite3"))
+    replica.origem = planilha.origem
+    replica.abas = ["Porangatu", "Formoso", "menus"]
+    replica.sincroniza()
+    return replica
+
+
+def _ids(backend, tabela):
+    return sorted(backend.select_aba(tabela, {})["ID"].tolist())
+
+
+def test_rodada_pulada_quando_a_planilha_nao_mudou(replica, planilha):
+    planilha.leituras.clear()
+    replica.sincroniza()
+    assert planilha.leituras == []
+
+    planilha.versao = "v2"
+    replica.sincroniza()
+    assert planilha.leituras == [["Porangatu", "Formoso", "menus"]]
+
+
+def test_aba_com_mesma_assinatura_nao_e_regravada(replica, planilha, monkeypatch):
+    regravadas = []
+    substitui = replica.local.substitui
+    monkeypatch.setattr(replica.local, "substitui", lambda t, df: (regravadas.append(t), substitui(t, df)))
+    planilha.origem.update("menus", ["Nome"], ["Painel"], banco_sqlite.eq("ID", "m2"), {})
+    planilha.versao = "v2"
+
+    replica.sincroniza()
+
+    assert regravadas == ["menus"]
+    assert replica.select_aba("menus", {})["Nome"].tolist() == ["Início", "Painel"]
+
+
+def test_escrita_durante_a_rodada_nao_e_sobrescrita(replica, planilha, monkeypatch):
+    def le_e_escreve(abas):
+        lidas = planilha.le_abas(abas)  # a rodada já leu a versão antiga...
+        replica.insert("menus", {"ID": "m3", "Nome": "Relatórios"})  # ...e a escrita chega agora
+        return lidas
+    monkeypatch.setattr(banco_sqlite, "_le_abas", le_e_escreve)
+    planilha.versao = "v2"
+
+    replica.sincroniza()
+
+    assert _ids(replica, "menus") == ["m1", "m2", "m3"]
+
+
+def test_move_leva_a_linha_para_o_destino(replica, planilha, monkeypatch):
+    versoes = []
+    move = replica.local.move
+    def move_local(*args):
+        versoes.append(dict(replica._versoes))  # na mesma seção em que a réplica muda
+        return move(*args)
+    monkeypatch.setattr(replica.local, "move", move_local)
+
+    assert replica.move("p1", "Porangatu", "Formoso", {"Nome Fantasia": "Y"}) == 1
+
+    assert versoes == [{"Porangatu": 1, "Formoso": 1}]
+    assert _ids(replica, "Porangatu") == ["p2"]
+    assert _ids(replica, "Formoso") == ["f1", "p1"]
+    assert _ids(planilha.origem, "Formoso") == ["f1", "p1"]
+
+
+def test_move_durante_a_rodada_nao_some_do_destino(replica, planilha, monkeypatch):
+    def le_e_move(abas):
+        lidas = planilha.le_abas(abas)
+        replica.move("p1", "Porangatu", "Formoso")
+        return lidas
+    monkeypatch.setattr(banco_sqlite, "_le_abas", le_e_move)
+    planilha.versao = "v2"
+
+    replica.sincroniza()
+
+    assert _ids(replica, "Porangatu") == ["p2"]
+    assert _ids(replica, "Formoso") == ["f1", "p1"]
+
+
+def test_upsert_so_atualiza_nao_insere(replica, planilha):
+    resultado = replica.upsert("menus", [{"ID": "m1", "Nome": "Home"}, {"ID": "m9", "Nome": "Apagado"}],
+                               so_atualiza=True)
+
+    assert resultado["resultado"].tolist() == ["atualizado", "ausente"]
+    assert _ids(replica, "menus") == ["m1", "m2"]
+    assert _ids(planilha.origem, "menus") == ["m1", "m2"]
+    assert replica.select_aba("menus", {})["Nome"].tolist()[0] == "Home"
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from funcoes_compartilhadas import conversa_banco
+
+
+def test_projecao_ignora_aba_que_nao_existe(monkeypatch):
+    # Nada em cache nem na leitura por colunas: tudo cai no plano B (leitura completa)
+    monkeypatch.setattr(conversa_banco, "_projecao_em_cache", lambda nome, colunas: None)
+    monkeypatch.setattr(conversa_banco, "_le_projecoes", lambda abas, colunas: {})
+    completos = {
+        "Porangatu": pd.DataFrame({"ID": ["p1"], "Nome Fantasia": ["X"], "Telefone": ["1"]}),
+        "Formoso": None,  # aba apagada ou renomeada na planilha
+    }
+
+    frames = conversa_banco._frames_projetados(
+        ["Porangatu", "Formoso"], ["ID", "Nome Fantasia"], lambda abas: {nome: completos[nome] for nome in abas},
+    )
+
+    assert list(frames["Porangatu"].columns) == ["ID", "Nome Fantasia"]
+    assert frames["Formoso"] is None
+    assert conversa_banco._concatena_protocolos(frames)["ID"].tolist() == ["p1"]
+
+
+def test_ordena_numeros_com_celula_vazia():
+    # Menus tipados pelo esquema: "Ordem" numérica com uma célula vazia (NaN)
+    menus = pd.DataFrame({"Nome": ["dez", "dois", "vazio", "um"], "Ordem": [10.0, 2.0, float("nan"), 1.0]})
+
+    ordenado = conversa_banco._consulta(menus, [], conversa_banco._ordem("Ordem"), None, [])
+
+    assert ordenado["Nome"].tolist() == ["um", "dois", "dez", "vazio"]
+
+
+def test_ordena_texto_numerico_com_vazios():
+    menus = pd.DataFrame({"Nome": ["dez", "nada", "dois", "vazio"], "Ordem": ["10", None, "2", ""]})
+
+    ordenado = conversa_banco._consulta(menus, [], conversa_banco._ordem("Ordem"), None, [])
+
+    assert ordenado["Nome"].tolist()[:2] == ["dois", "dez"]
+
+
+class AbaFalsa:
+    """Só o que a leitura completa usa de um gspread.Worksheet"""
+
+    def __init__(self, title, valores):
+        self.title = title
+        self.valores = valores
+
+    def get(self, **kwargs):
+        return [list(linha) for linha in self.valores]
+
+
+def test_leitura_completa_atualiza_cabecalho(tmp_path, monkeypatch):
+    ws = AbaFalsa("menus", [["ID", "Nome", "Ordem", "Ícone"], ["m1", "Início", 1, "🏠"]])
+    monkeypatch.setattr(conversa_banco, "SNAPSHOT_DIR", str(tmp_path))
+    for cache in ("_cache", "_marcadores", "_indices", "_bases_incrementais"):
+        monkeypatch.setattr(conversa_banco, cache, {})
+    monkeypatch.setattr(conversa_banco, "_aba", lambda tabela: ws)
+    monkeypatch.setattr(conversa_banco, "_versao_planilha", lambda *a, **k: None)
+    monkeypatch.setitem(conversa_banco._cabecalhos, "menus", ["ID", "Nome", "Ordem"])  # lido antes da coluna nova
+
+    conversa_banco._le_aba("menus")
+
+    assert conversa_banco._mapa_colunas(ws)["ícone"] == 4
+
+
+def test_ids_do_filtro_sem_ponto_zero():
+    filtros = conversa_banco._filtros(conversa_banco.em("ID", [5.0, "7", " m1 ", 2.5]))
+
+    assert conversa_banco._ids_do_filtro(filtros) == ["5", "7", "m1", "2.5"]
+    assert conversa_banco._ids_do_filtro(conversa_banco._filtros(conversa_banco.eq("ID", 12.0))) == ["12"]
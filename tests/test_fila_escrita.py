@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from funcoes_compartilhadas import fila_escrita
+from funcoes_compartilhadas.conversa_banco import Backend, eq
+from funcoes_compartilhadas.fila_escrita import BackendFila
+
+
+class OrigemFalsa(Backend):
+    """Backend de origem que só anota a ordem das escritas gravadas"""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def insert(self, tabela, dados, tipos_colunas=None):
+        self.chamadas.append(("insert", tabela))
+
+    def update(self, tabela, campos, valores, where, tipos_colunas):
+        self.chamadas.append(("update", tabela))
+        return 1
+
+    def delete(self, tabela, where, tipos_colunas):
+        self.chamadas.append(("delete", tabela))
+        return 1
+
+    def upsert(self, tabela, dados, key="ID", tipos_colunas=None, so_atualiza=False):
+        self.chamadas.append(("upsert", tabela, so_atualiza))
+
+    def move(self, id_linha, de, para, alteracoes=None, id_col="ID", tipos_colunas=None):
+        self.chamadas.append(("move", de, para))
+        return 1
+
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    frames = {
+        "Porangatu": pd.DataFrame({"ID": ["p1"], "Nome Fantasia": ["X"], "Cidade": ["Porangatu"]}),
+        "Formoso": pd.DataFrame({"ID": ["f1"], "Nome Fantasia": ["F"], "Cidade": ["Formoso"]}),
+    }
+    monkeypatch.setattr(fila_escrita, "_frame_aba", lambda tabela: frames[tabela])
+    monkeypatch.setattr(BackendFila, "_laco", lambda self: None)  # descarga só quando o teste pedir
+    return BackendFila(OrigemFalsa(), str(tmp_path / "fila.sqlite3"))
+
+
+def test_update_no_destino_espera_o_move(fila):
+    # A fila do destino já existe antes do move (um insert mais antigo)
+    fila.insert("Formoso", {"ID": "f2", "Nome Fantasia": "G", "Cidade": "Formoso"})
+    assert fila.move("p1", "Porangatu", "Formoso", {"Cidade": "Formoso"}) == 1
+    assert fila.update("Formoso", ["Nome Fantasia"], ["Y"], eq("ID", "p1"), {}) == 1
+
+    fila.descarrega()
+
+    chamadas = fila.origem.chamadas
+    assert chamadas.index(("move", "Porangatu", "Formoso")) < chamadas.index(("update", "Formoso"))
+    assert chamadas[0] == ("insert", "Formoso")  # o que veio antes do move não precisa esperar
+    assert fila.situacao()["pendentes"] == 0
+
+
+def test_upsert_so_atualiza_nao_recria_linha_apagada(fila):
+    fila.delete_many("Porangatu", ["p1"])
+    resultado = fila.upsert("Porangatu", [{"ID": "p1", "Nome Fantasia": "Y"}], so_atualiza=True)
+
+    assert resultado["resultado"].tolist() == ["ausente"]
+    assert fila.sobrepoe("Porangatu", fila_escrita._frame_aba("Porangatu")).empty
+    fila.descarrega()
+    assert fila.origem.chamadas == [("delete", "Porangatu")]
+
+
+def test_erro_some_depois_de_gravar(fila, monkeypatch):
+    gravar = fila.origem.update
+    def falha_uma_vez(*args):
+        monkeypatch.setattr(fila.origem, "update", gravar)
+        raise RuntimeError("429 quota")
+    monkeypatch.setattr(fila.origem, "update", falha_uma_vez)
+    fila.update("Porangatu", ["Nome Fantasia"], ["Y"], eq("ID", "p1"), {})
+
+    fila.descarrega()
+    assert fila.situacao()["erro"] == "Porangatu: 429 quota"
+
+    fila._espera.clear()  # sem esperar o backoff
+    fila.descarrega()
+    assert fila.situacao() == {"pendentes": 0, "falhas": 0, "erro": ""}